@@ -5,6 +5,10 @@ import pandas as pd
 
 from src.data_collection.dart_api import fetch_all_corp_codes
 from src.utils.db import fetch_dataframe
+from src.utils.formatting import RAW_COLUMNS, fmt, format_raw_statement
+from src.utils.payloads import load_payload, payload_key
+from src.analysis.sector_stats import sector_of, load_sector_benchmark
+from components.chart import render_ratios, render_comparison
 
 # 페이지 설정
 st.set_page_config(page_title="Stock Analysis Dashboard", layout="wide")
@@ -43,7 +47,7 @@ with st.sidebar:
     # 종목 선택 콤보박스
     if filtered_df.empty:
         st.warning("조건에 맞는 종목이 없습니다.")
-        ticker = corp_name = None
+        ticker = corp_name = sector = None
     else:
         selected = st.selectbox(
             "종목 선택",
@@ -51,6 +55,7 @@ with st.sidebar:
             help="리스트에서 종목을 선택하세요"
         )
         ticker, corp_name = selected.split(maxsplit=1)
+        sector = sector_of(df_codes.loc[df_codes['stock_code'] == ticker, 'induty_code'].iloc[0])
 
     # 연도 선택
     year = st.number_input(
@@ -88,92 +93,136 @@ st.subheader(
     f"{reprt_map[reprt_code]} ({ticker}) – {corp_name} – {year}년 ({fs_div_map[fs_div]})"
 )
 
-# --- 요약 재무 지표 조회 ---
-summary_sql = """
-SELECT operating_margin         AS "영업이익률(%)",
-       roe                     AS "ROE(%)",
-       debt_ratio              AS "부채비율(%)",
-       controlling_debt_ratio  AS "부채비율(지배주주 기준 %)"
-FROM summary_financials
-WHERE ticker = :ticker
-  AND year   = :year
-  AND report_code = :reprt
-  AND fs_div      = :fs_div
-"""
+# --- 종목 payload 조회 (수집기가 미리 계산한 요약 지표 + 포맷된 원본 재무제표) ---
+@st.cache_data(ttl=600, show_spinner=False)
+def get_payload(ticker):
+    return load_payload(ticker)
+
+payload = get_payload(ticker) if ticker else None
+key = payload_key(year, reprt_code, fs_div)
 params = {"ticker": ticker, "year": int(year), "reprt": reprt_code, "fs_div": fs_div}
-summary_df = fetch_dataframe(summary_sql, params)
-if summary_df.empty:
-    st.warning("선택된 조건의 요약 재무 데이터가 없습니다.")
-    st.stop()
 
-# 메트릭 표시
-def fmt(x):
-    return f"{x:,.2f}" if pd.notnull(x) else "N/A"
+# --- 요약 재무 지표 조회 ---
+if payload is not None:
+    summary = payload["summary"].get(key)
+    if summary is None:
+        st.warning("선택된 조건의 요약 재무 데이터가 없습니다.")
+        st.stop()
+    om, roe = summary["operating_margin"], summary["roe"]
+    dr, cdr = summary["debt_ratio"], summary["controlling_debt_ratio"]
+else:
+    # payload 가 아직 없는 종목은 테이블에서 직접 조회
+    summary_sql = """
+    SELECT operating_margin         AS "영업이익률(%)",
+           roe                     AS "ROE(%)",
+           debt_ratio              AS "부채비율(%)",
+           controlling_debt_ratio  AS "부채비율(지배주주 기준 %)"
+    FROM summary_financials
+    WHERE ticker = :ticker
+      AND year   = :year
+      AND report_code = :reprt
+      AND fs_div      = :fs_div
+    """
+    summary_df = fetch_dataframe(summary_sql, params)
+    if summary_df.empty:
+        st.warning("선택된 조건의 요약 재무 데이터가 없습니다.")
+        st.stop()
+
+    om = summary_df["영업이익률(%)"].iloc[0]
+    roe = summary_df["ROE(%)"].iloc[0]
+    dr = summary_df["부채비율(%)"].iloc[0]
+    cdr = summary_df["부채비율(지배주주 기준 %)"].iloc[0]
 
-om = summary_df["영업이익률(%)"].iloc[0]
-roe = summary_df["ROE(%)"].iloc[0]
-dr = summary_df["부채비율(%)"].iloc[0]
-cdr = summary_df["부채비율(지배주주 기준 %)"].iloc[0]
+# 메트릭 표시
 # Debt-to-Equity 비율 계산
 if pd.notnull(dr) and dr < 100:
     de_ratio = dr / (100 - dr) * 100
 else:
     de_ratio = None
+# --- 동종업계(업종 중앙값) 비교: 수집기가 미리 집계한 sector_stats 기본키 조회 ---
+@st.cache_data(ttl=600, show_spinner=False)
+def get_benchmark(sector, year, reprt_code, fs_div):
+    return load_sector_benchmark(sector, year, reprt_code, fs_div)
+
+bench = get_benchmark(sector, int(year), reprt_code, fs_div) if sector else {}
+
+def vs_peer(metric, value):
+    med = bench.get(metric, {}).get("median")
+    if med is None or pd.isna(value):
+        return None
+    return f"{value - med:+,.2f}%p vs 업종 중앙값 {med:,.2f}"
+
 cols = st.columns(5)
-cols[0].metric("영업이익률(%)", fmt(om))
-cols[1].metric("ROE(%)", fmt(roe), delta="높을수록 효율적 이익")
-cols[2].metric("부채비율 (%)", fmt(dr))
+cols[0].metric("영업이익률(%)", fmt(om), delta=vs_peer("operating_margin", om))
+cols[1].metric("ROE(%)", fmt(roe), delta=vs_peer("roe", roe) or "높을수록 효율적 이익")
+cols[2].metric("부채비율 (%)", fmt(dr), delta=vs_peer("debt_ratio", dr), delta_color="inverse")
 cols[3].metric("부채대자본비율 (%)", fmt(de_ratio))
 cols[4].metric("지배주주 D/E 비율 (%)", fmt(cdr))
+if bench:
+    n = max(v["n"] for v in bench.values())
+    st.caption(
+        f"업종(KSIC {sector}) {n}개사 기준 - 중앙값 "
+        + " · ".join(
+            f"{label} {fmt(bench[m]['median'])} (p25 {fmt(bench[m]['p25'])} ~ p75 {fmt(bench[m]['p75'])})"
+            for m, label in [("operating_margin", "영업이익률"), ("roe", "ROE"), ("debt_ratio", "부채비율")]
+            if m in bench
+        )
+    )
+
+# 재무비율 막대 차트 (같은 값이면 캐시된 PNG 재사용)
+st.image(render_ratios({"영업이익률(%)": om, "ROE(%)": roe, "부채비율(%)": dr}))
 
 st.markdown("---")
 
+# --- 종목 비교 차트 (여러 종목 × 연도) ---
+compare_metrics = {
+    "operating_margin": "영업이익률(%)",
+    "roe": "ROE(%)",
+    "debt_ratio": "부채비율(%)",
+    "controlling_debt_ratio": "부채비율(지배주주 기준 %)",
+}
+with st.expander("📈 종목 비교 차트"):
+    compare_labels = st.multiselect(
+        "비교 종목",
+        options=sorted(df_codes["label"]),
+        default=[l for l in df_codes["label"] if l.split(maxsplit=1)[0] == ticker],
+    )
+    metric = st.selectbox(
+        "지표", options=list(compare_metrics.keys()), format_func=lambda x: compare_metrics[x]
+    )
+    if compare_labels:
+        compare_tickers = [l.split(maxsplit=1)[0] for l in compare_labels]
+        compare_df = fetch_dataframe(f"""
+            SELECT s.ticker, s.year AS x, s.{metric} AS value
+              FROM summary_financials s
+             WHERE s.ticker = ANY(:tickers)
+               AND s.report_code = :reprt
+               AND s.fs_div      = :fs_div
+        """, {"tickers": compare_tickers, "reprt": reprt_code, "fs_div": fs_div})
+        label_map = dict(zip(df_codes["stock_code"], df_codes["label"]))
+        compare_df["label"] = compare_df["ticker"].map(label_map)
+        st.image(render_comparison(compare_df, compare_metrics[metric]))
+
 # --- 원본 재무제표 보기 (백만 원 단위) ---
 if st.checkbox("원본 재무제표 보기 (백만 원 단위)"):
-    raw_sql = """
-    SELECT account_nm   AS "계정명",
-           (thstrm_amount::numeric/1000000) AS "당기금액(백만 원)",
-           (frmtrm_amount::numeric/1000000) AS "전기금액(백만 원)"
-    FROM raw_financials
-    WHERE ticker = :ticker
-      AND year   = :year
-      AND report_code = :reprt
-      AND fs_div      = :fs_div
-    """
-    raw_df = fetch_dataframe(raw_sql, params)
-    if raw_df.empty:
+    if payload is not None:
+        rows = payload["raw"].get(key, [])
+        raw_fmt = pd.DataFrame(rows, columns=RAW_COLUMNS)
+    else:
+        raw_sql = """
+        SELECT a.account_nm   AS "계정명",
+               (r.thstrm_amount / 1000000.0) AS "당기금액(백만 원)",
+               (r.frmtrm_amount / 1000000.0) AS "전기금액(백만 원)"
+        FROM raw_financials r
+        JOIN account_dim a ON a.account_key = r.account_key
+        WHERE r.ticker = :ticker
+          AND r.year   = :year
+          AND r.report_code = :reprt
+          AND r.fs_div      = :fs_div
+        """
+        raw_df = fetch_dataframe(raw_sql, params)
+        raw_fmt = format_raw_statement(raw_df)
+    if raw_fmt.empty:
         st.info("원본 재무제표 데이터가 없습니다.")
     else:
-        def to_korean_amt(x):
-            if pd.isna(x):
-                return ""
-            amount = int(x * 1_000_000)
-            jo = amount // 1_000_000_000_000
-            rem = amount % 1_000_000_000_000
-            eok = rem // 100_000_000
-            rem2 = rem % 100_000_000
-            man = rem2 // 10_000
-            thous = man // 1000
-            hund = (man % 1000) // 100
-            parts = []
-            if jo:
-                parts.append(f"{jo}조")
-            if eok:
-                parts.append(f"{eok:,}억")
-            if thous:
-                parts.append(f"{thous}천")
-            if hund:
-                parts.append(f"{hund}백")
-            if jo or eok or thous or hund:
-                parts.append("만 원")
-                return " ".join(parts)
-            return f"{amount:,}원"
-        raw_fmt = raw_df.copy()
-        raw_fmt["당기금액(백만 원)"] = raw_fmt["당기금액(백만 원)"].map(lambda x: f"{x:,.0f}" if pd.notnull(x) else "")
-        raw_fmt["전기금액(백만 원)"] = raw_fmt["전기금액(백만 원)"].map(lambda x: f"{x:,.0f}" if pd.notnull(x) else "")
-        raw_fmt["당기금액(한글)"] = raw_df["당기금액(백만 원)"].apply(to_korean_amt)
-        raw_fmt["전기금액(한글)"] = raw_df["전기금액(백만 원)"].apply(to_korean_amt)
-        st.dataframe(
-            raw_fmt[["계정명", "당기금액(백만 원)", "당기금액(한글)", "전기금액(백만 원)", "전기금액(한글)"]],
-            height=500
-        )
+        st.dataframe(raw_fmt, height=500)
@@ -1,25 +1,180 @@
-import matplotlib.pyplot as plt
-import matplotlib
+# components/chart.py
+#
+# 재무비율 차트 렌더링
+#   - pyplot 전역 상태 없이 Figure(Agg)로 그려 PNG/SVG 바이트로 반환
+#   - 입력 데이터 해시를 키로 렌더 결과를 LRU 캐시 → 같은 화면 재조회 시 렌더 비용 없음
+#   - 한글 폰트는 설치된 후보 중 첫 번째를 한 번만 찾아 설정 (없는 폰트 fallback 탐색 반복 방지)
+#   - matplotlib 은 첫 렌더링(캐시 miss) 때 import → 차트를 그리지 않는 화면/캐시 hit 은 로딩 비용 없음
+#   - numpy / pandas 도 실제 데이터 처리 시점에 import (모듈 import 만으로 로드하지 않음)
+import io
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, List, Mapping, Optional, Tuple
 
-# 한글폰트 설정 (윈도우: Malgun Gothic, macOS/Linux: NanumGothic 등)
-matplotlib.rcParams["font.family"] = "Malgun Gothic"
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
 
-import pandas as pd
+# 한글폰트 후보 (윈도우: Malgun Gothic, macOS: AppleGothic, Linux: NanumGothic / Noto CJK)
+FONT_CANDIDATES = ["Malgun Gothic", "AppleGothic", "NanumGothic", "Noto Sans CJK KR", "Noto Sans KR"]
+# 렌더 결과 캐시 크기 기본값 (CHART_CACHE_SIZE 환경변수)
+DEFAULT_CHART_CACHE_SIZE = 256
+# 비교 차트 한 종목 선(시계열)당 최대 점 수 기본값 (CHART_MAX_POINTS 환경변수, 초과 시 LTTB 다운샘플링)
+DEFAULT_MAX_POINTS = 200
 
-def plot_ratios(df_row: pd.Series):
+RATIO_LABELS = ["영업이익률(%)", "ROE(%)", "부채비율(%)"]
+
+_font_family: Optional[str] = None
+_cache: "OrderedDict[str, bytes]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def _new_figure(**kwargs):
     """
-    df_row: 단일 종목-연도 행. '영업이익률(%)','ROE(%)','부채비율(%)' 컬럼을 갖는다.
+    Agg 백엔드 Figure 를 만듭니다. (matplotlib 은 여기서 처음 import)
     """
-    labels = ["영업이익률(%)", "ROE(%)", "부채비율(%)"]
-    values = [
-        float(df_row["영업이익률(%)"]) if pd.notna(df_row["영업이익률(%)"]) else 0,
-        float(df_row["ROE(%)"])        if pd.notna(df_row["ROE(%)"])        else 0,
-        float(df_row["부채비율(%)"])    if pd.notna(df_row["부채비율(%)"])    else 0,
-    ]
+    import matplotlib
+    matplotlib.use("Agg")
+    from matplotlib.figure import Figure
+    setup_fonts()
+    return Figure(**kwargs)
+
+
+def setup_fonts() -> str:
+    """
+    설치된 한글 폰트를 한 번만 찾아 rcParams 에 설정하고 폰트 이름을 반환합니다.
+    """
+    global _font_family
+    if _font_family is None:
+        import matplotlib
+        from matplotlib import font_manager
+        installed = {f.name for f in font_manager.fontManager.ttflist}
+        _font_family = next((f for f in FONT_CANDIDATES if f in installed), "DejaVu Sans")
+        matplotlib.rcParams["font.family"] = _font_family
+        matplotlib.rcParams["axes.unicode_minus"] = False
+    return _font_family
+
+
+def _cache_key(kind: str, data, fmt: str) -> str:
+    body = json.dumps([kind, fmt, data], ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(body.encode("utf-8")).hexdigest()
+
 
-    fig, ax = plt.subplots()
-    ax.bar(labels, values)
+def _cached_render(kind: str, data, fmt: str, draw) -> bytes:
+    """
+    (kind, data, fmt) 해시로 캐시를 조회하고, 없으면 draw(fig) 로 그려 바이트를 저장합니다.
+    """
+    key = _cache_key(kind, data, fmt)
+    with _lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    fig = _new_figure(figsize=(8, 4.5), dpi=100)
+    draw(fig)
+    buf = io.BytesIO()
+    fig.savefig(buf, format=fmt, bbox_inches="tight")
+    out = buf.getvalue()
+
+    with _lock:
+        _cache[key] = out
+        limit = int(os.getenv("CHART_CACHE_SIZE", DEFAULT_CHART_CACHE_SIZE))
+        while len(_cache) > limit:
+            _cache.popitem(last=False)
+    return out
+
+
+def _ratio_values(df_row: Mapping) -> List[float]:
+    import pandas as pd
+    return [float(df_row[l]) if pd.notna(df_row.get(l)) else 0 for l in RATIO_LABELS]
+
+
+def _draw_ratios(ax, values: List[float]):
+    ax.bar(RATIO_LABELS, values)
     ax.set_ylim(0, max(values) * 1.5 if max(values) > 0 else 1)
     ax.set_ylabel("비율 (%)")
     ax.set_title("재무비율 비교")
+
+
+def plot_ratios(df_row: 'pd.Series'):
+    """
+    df_row: 단일 종목-연도 행. '영업이익률(%)','ROE(%)','부채비율(%)' 컬럼을 갖는다.
+    """
+    fig = _new_figure()
+    _draw_ratios(fig.add_subplot(), _ratio_values(df_row))
     return fig
+
+
+def render_ratios(df_row: Mapping, fmt: str = "png") -> bytes:
+    """
+    plot_ratios 와 같은 막대 차트를 PNG/SVG 바이트로 렌더링합니다. (입력 값 기준 캐시)
+    """
+    values = _ratio_values(df_row)
+    return _cached_render("ratios", values, fmt, lambda fig: _draw_ratios(fig.add_subplot(), values))
+
+
+def downsample(x: 'np.ndarray', y: 'np.ndarray', max_points: int) -> Tuple['np.ndarray', 'np.ndarray']:
+    """
+    LTTB(Largest-Triangle-Three-Buckets)로 시계열을 max_points 개 이하로 줄입니다.
+    첫/마지막 점은 유지하고, 각 구간에서 모양을 가장 잘 보존하는 점을 고릅니다.
+    """
+    import numpy as np
+
+    n = len(x)
+    if max_points >= n or max_points < 3:
+        return x, y
+    keep = [0]
+    edges = np.linspace(1, n - 1, max_points - 1).astype(int)
+    a = 0
+    for i in range(len(edges) - 1):
+        lo, hi = edges[i], max(edges[i + 1], edges[i] + 1)
+        nxt_lo, nxt_hi = edges[i + 1], edges[i + 2] if i + 2 < len(edges) else n
+        cx, cy = x[nxt_lo:max(nxt_hi, nxt_lo + 1)].mean(), y[nxt_lo:max(nxt_hi, nxt_lo + 1)].mean()
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        keep.append(a)
+    keep.append(n - 1)
+    keep = np.unique(keep)
+    return x[keep], y[keep]
+
+
+def render_comparison(
+    df: 'pd.DataFrame',
+    metric_label: str,
+    fmt: str = "png",
+    max_points: Optional[int] = None
+) -> bytes:
+    """
+    여러 종목 × 여러 연도 비교 선 차트.
+    df: (label, x, value) 컬럼 - label 은 종목 표시명, x 는 연도(또는 연도.분기 등 숫자)
+    종목별 시계열은 max_points 개 이하로 다운샘플링한 뒤 그리며, 결과는 입력 해시로 캐시됩니다.
+    """
+    if max_points is None:
+        max_points = int(os.getenv("CHART_MAX_POINTS", DEFAULT_MAX_POINTS))
+    series: Dict[str, List[List[float]]] = {}
+    for label, grp in df.dropna(subset=["value"]).sort_values("x").groupby("label", sort=True):
+        xs, ys = downsample(
+            grp["x"].to_numpy(dtype=float), grp["value"].to_numpy(dtype=float), max_points
+        )
+        series[str(label)] = [xs.tolist(), ys.tolist()]
+
+    def draw(fig):
+        ax = fig.add_subplot()
+        for label, (xs, ys) in series.items():
+            ax.plot(xs, ys, marker="o" if len(xs) <= 20 else None, linewidth=1.2, label=label)
+        ax.set_ylabel(metric_label)
+        ax.set_title(f"{metric_label} 종목 비교")
+        ax.grid(alpha=0.3)
+        if series:
+            ax.legend(fontsize=8, ncol=max(1, len(series) // 12 + 1), loc="best")
+        ax.xaxis.get_major_locator().set_params(integer=True)
+
+    return _cached_render("comparison", [metric_label, series], fmt, draw)
+
+
+def cache_info() -> Dict[str, int]:
+    with _lock:
+        return {"entries": len(_cache), "bytes": sum(len(v) for v in _cache.values())}
@@ -1,38 +1,38 @@
 import os
-import json
 from datetime import datetime
 from zoneinfo import ZoneInfo
-from dotenv import load_dotenv
 import logging
+import argparse
 import pandas as pd
-import requests
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 import sys
 
 from src.data_collection.dart_api import (
     fetch_all_corp_codes,
-    fetch_latest_for_year,
+    load_cached_statement,
+    cached_content_hash,
+    fetch_statement,
+    fetch_headline_batch,
     REPORT_CODE,
-    FS_PRIORITY
-)
-from src.utils.db import execute_query
-from src.analysis.ratios import compute_ratios
-
-# --- 1. 환경 변수 및 로깅 설정 -----------------------------------------
-load_dotenv(override=True)
-DATABASE_URL = os.getenv('DATABASE_URL')
-if not DATABASE_URL:
-    raise RuntimeError("환경변수 DATABASE_URL이 설정되지 않았습니다.")
-
-logging.basicConfig(
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    level=logging.INFO  # 로그 레벨을 INFO로 설정
+    MULTI_BATCH_SIZE
 )
+from src.utils.config import require, setting, setting_list
+from src.utils.db import get_engine
+from src.utils.storage import insert_raw, upsert_cache, upsert_summary, decode_cache_payload, content_hash
+from src.utils.payloads import refresh_payloads
+from src.data_collection.planner import make_plan, describe
+from src.data_collection.universe import sync_universe, update_industry_codes
+from src.analysis.sector_stats import refresh_sector_stats
+from src.data_collection.pipeline import PipelineStats, prepare, unchanged, run_pipeline
+from src.analysis.ratios import summarize_financials
+
+# --- 1. 로깅 설정 -------------------------------------------------------
+# 환경 변수(.env)와 DB 엔진은 처음 사용할 때 로드/생성합니다. (src.utils.config, src.utils.db)
+# basicConfig 는 스크립트 실행 시에만 설정 (import 만 하는 쪽의 로깅 설정을 바꾸지 않음)
 logger = logging.getLogger(__name__)  # 로거 객체 생성
 logger.setLevel(logging.DEBUG)  # 디버그 레벨의 로그도 출력하도록 설정
 
-# --- 2. DB 연결 ---------------------------------------------------------
-engine = create_engine(DATABASE_URL)  # SQLAlchemy 엔진을 이용한 DB 연결
+# --- 2. 시간대 ----------------------------------------------------------
 kst = ZoneInfo("Asia/Seoul")  # 한국 표준시 설정
 
 # --- 3. 한글명 매핑 -----------------------------------------------------
@@ -49,27 +49,26 @@ FS_MAP = {
 }
 
 # --- 4. 캐시 조회/저장 함수 -----------------------------------------------
-def load_cached(corp_code, year):
+def load_cached(corp_code, year, report_code=REPORT_CODE):
     """
-    dart_cache에서 (corp_code, year)의 캐시를 조회합니다.
+    dart_cache에서 (corp_code, year, report_code)의 캐시를 조회합니다.
     이미 캐시된 데이터가 있는지 확인하고, 있으면 반환합니다.
     """
-    with engine.connect() as conn:
+    with get_engine().connect() as conn:
         r = conn.execute(text("""
-            SELECT stock_code, report_code, fs_div, recs
+            SELECT stock_code, report_code, fs_div, recs, recs_z
               FROM dart_cache
-             WHERE corp_code = :c AND year = :y
-        """), {"c": corp_code, "y": year}).fetchone()
+             WHERE corp_code = :c AND year = :y AND report_code = :r
+        """), {"c": corp_code, "y": year, "r": report_code}).fetchone()
 
     if not r:  # 캐시가 없으면 None을 반환
         return None
 
-    recs = r.recs if isinstance(r.recs, (list, dict)) else json.loads(r.recs)
     return {
         "stock_code": r.stock_code,
         "report_code": r.report_code,
         "fs_div": r.fs_div,
-        "recs": recs
+        "recs": decode_cache_payload(r.recs, r.recs_z)
     }
 
 def save_cache(corp_code, corp_name, stock_code, year,
@@ -78,30 +77,8 @@ def save_cache(corp_code, corp_name, stock_code, year,
     dart_cache에 데이터를 upsert 합니다.
     캐시를 저장 또는 업데이트하여 추후 동일 데이터를 중복 조회하지 않도록 합니다.
     """
-    payload = json.dumps(recs, ensure_ascii=False)
-    with engine.begin() as conn:
-        conn.execute(text("""
-            INSERT INTO dart_cache(
-              corp_code, stock_code, year,
-              report_code, fs_div, recs
-            ) VALUES (
-              :c, :s, :y,
-              :r, :f, :j
-            )
-            ON CONFLICT(corp_code, year, stock_code)
-            DO UPDATE SET
-              report_code  = EXCLUDED.report_code,
-              fs_div        = EXCLUDED.fs_div,
-              recs          = EXCLUDED.recs,
-              last_updated  = NOW()
-        """), {
-            "c": corp_code,
-            "s": stock_code,
-            "y": year,
-            "r": report_code,
-            "f": fs_div,
-            "j": payload
-        })
+    with get_engine().begin() as conn:
+        upsert_cache(conn, corp_code, stock_code, year, recs, report_code, fs_div)
 
     fs_name  = FS_MAP.get(fs_div, fs_div)
     rpt_name = RPT_MAP.get(report_code, report_code)
@@ -119,10 +96,10 @@ def load_corp_codes_from_csv(file_path="corp_codes.csv"):
     if not os.path.exists(file_path):
         logger.info("▷ corp_codes.csv 파일이 없습니다. DART로부터 다운로드를 시작합니다.")
 
+        import requests
+
         url = "https://opendart.fss.or.kr/api/corpCode.xml"
-        api_key = os.getenv("DART_API_KEY")
-        if not api_key:
-            raise RuntimeError("환경변수 DART_API_KEY가 설정되지 않았습니다.")
+        api_key = require("DART_API_KEY")
 
         res = requests.get(url, params={"crtfc_key": api_key})
         if res.status_code != 200:
@@ -178,7 +155,7 @@ def insert_corp_codes_to_db(df):
         VALUES (:corp_code, :stock_code, :corp_name)
         ON CONFLICT(corp_code) DO NOTHING;
     """
-    with engine.begin() as conn:
+    with get_engine().begin() as conn:
         for _, row in df.iterrows():
             conn.execute(text(insert_sql), {
                 "corp_code": row["corp_code"],
@@ -187,166 +164,222 @@ def insert_corp_codes_to_db(df):
             })
     logger.info("▷ corp_codes DB에 저장 완료")
 
-# --- 6. 메인 로직 --------------------------------------------------------
-def main():
+# --- 6. RAW / SUMMARY 저장 함수 -------------------------------------------
+# derived_from: NULL 이면 해당 연도 보고서에서 직접 수집한 값,
+#               값이 있으면 그 연도 사업보고서의 전기/전전기 금액에서 파생한 값
+def save_raw(name, tkr, yr, rpt, fdiv, stmt, derived_from=None):
+    """
+    raw_financials에 계정별 금액을 upsert 합니다.
+    계정명은 account_dim 의 account_key 로, 금액은 bigint 로 저장합니다. (storage.insert_raw)
+    """
+    with get_engine().begin() as conn:
+        cnt = insert_raw(conn, tkr, yr, rpt, fdiv, stmt, derived_from)
+    logger.info(f"    ✓ RAW upsert 완료 ({cnt}건)")
+
+
+def save_summary(name, tkr, yr, rpt, fdiv, stmt, derived_from=None):
+    """
+    파싱된 재무제표(stmt)로 재무 분석 지표를 계산해 summary_financials에 upsert 합니다.
+    파생 지표(derived_from)는 직접 수집한 지표를 덮어쓰지 않습니다. (storage.upsert_summary)
+    """
+    logger.info("▷ 재무 분석 지표 계산 시작")
+    s = summarize_financials(stmt, tkr)
+    with get_engine().begin() as conn:
+        upsert_summary(conn, name, tkr, yr, rpt, fdiv, s, derived_from)
+
+# --- 7. 수집 모드 ---------------------------------------------------------
+# 두 모드 모두 pipeline.run_pipeline 으로 실행: fetch 워커가 DART 조회·파싱·지표 계산을 하고
+# writer 하나가 결과를 모아 cache/raw/summary 를 한 트랜잭션으로 저장합니다.
+def collect_full(items, names):
+    """
+    전체 재무제표 모드: 계획된 (종목, 연도, 보고서)마다 fnlttSinglAcntAll 을 호출해
+    dart_cache, raw_financials, summary_financials 를 모두 채웁니다. (호출 수 많음)
+    PipelineStats(저장된 종목 touched, 중단 오류 error 포함)를 반환합니다.
+    """
+    total = len(items)
+
+    def fetch_one(unit):
+        idx, item = unit
+        tkr, corp, yr = item.ticker, item.corp_code, item.year
+        name = names[tkr]
+        logger.info(f"=== [{idx}/{total}] {tkr} ({name}) | 사업연도 {yr} [{RPT_MAP.get(item.reprt_code, item.reprt_code)}] ===")
+
+        # CFS 캐시는 계획 단계에서 이미 제외됨 - 금액은 여기서 한 번만 파싱됨
+        cached = load_cached_statement(corp, tkr, yr, item.reprt_code)
+        if cached is not None:
+            stmt, rpt, fdiv = cached
+        else:
+            stmt, rpt, fdiv = fetch_statement(corp, yr, item.reprt_code)
+
+        if not len(stmt):
+            logger.warning(f"    ■ {tkr} {yr} 공시 없음")
+            return []
+        logger.info(f"    ▶ {tkr} {yr} [{RPT_MAP.get(rpt, rpt)}, {FS_MAP.get(fdiv, fdiv)}] 조회 완료")
+        if cached is not None:
+            return [prepare(tkr, corp, name, yr, rpt, fdiv, stmt)]
+
+        # 재조회 결과가 저장된 원본과 같으면 지표 계산·raw/summary 저장 생략 (checked_at 만 갱신)
+        digest = content_hash(stmt, fdiv)
+        if digest == cached_content_hash(corp, yr, rpt):
+            logger.info(f"    ✓ {tkr} {yr} 변경 없음 → 저장 생략")
+            return [unchanged(tkr, corp, name, yr, rpt, fdiv)]
+        # 캐시는 raw/summary 와 같은 트랜잭션에서 저장
+        return [prepare(tkr, corp, name, yr, rpt, fdiv, stmt, write_cache=True, digest=digest)]
+
+    stats = run_pipeline(enumerate(items, start=1), fetch_one)
+    logger.info(
+        f"▷ 전체 재무제표 반영 {stats.results - stats.unchanged}/{total}건, "
+        f"변경 없음 {stats.unchanged}건 (트랜잭션 {stats.batches}회)"
+    )
+    return stats
+
+
+def collect_headline(items, names):
+    """
+    주요계정 모드: 계획된 작업을 (연도, 보고서)별로 묶어 fnlttMultiAcnt 로
+    최대 MULTI_BATCH_SIZE 개 회사를 한 번에 조회하고 summary_financials 만 채웁니다.
+    (스크리닝용, 호출 수 1/100 수준 - 원본 재무제표는 COLLECT_MODE=full 로 수집)
+    PipelineStats(저장된 종목 touched, 중단 오류 error 포함)를 반환합니다.
+    """
+    groups = {}
+    for item in items:
+        groups.setdefault((item.year, item.reprt_code), []).append(item)
+
+    # 호출 1회 = (연도, 보고서, 최대 MULTI_BATCH_SIZE 개 회사) 묶음
+    units = []
+    for (yr, rpt), group in groups.items():
+        logger.info(
+            f"=== 사업연도 {yr} [{RPT_MAP.get(rpt, rpt)}]: 주요계정 조회 대상 {len(group)}개 "
+            f"(호출 {-(-len(group) // MULTI_BATCH_SIZE)}회) ==="
+        )
+        for i in range(0, len(group), MULTI_BATCH_SIZE):
+            units.append((yr, rpt, group[i:i + MULTI_BATCH_SIZE]))
+
+    def fetch_batch(unit):
+        yr, rpt, batch = unit
+        by_corp = {item.corp_code: item.ticker for item in batch}
+        results = fetch_headline_batch(list(by_corp), yr, rpt, tickers=by_corp)
+        out = []
+        for corp, (stmt, fdiv) in results.items():
+            tkr = by_corp.get(corp)
+            if tkr is None:
+                continue
+            out.append(prepare(tkr, corp, names[tkr], yr, rpt, fdiv, stmt, with_raw=False))
+        logger.info(f"    ✓ {yr} [{RPT_MAP.get(rpt, rpt)}] 주요계정 조회 {len(out)}/{len(batch)}건")
+        return out
+
+    stats = run_pipeline(units, fetch_batch)
+    logger.info(f"▷ 주요계정 반영 {stats.results}/{len(items)}건 (트랜잭션 {stats.batches}회)")
+    return stats
+
+# --- 8. 메인 로직 --------------------------------------------------------
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="DART 재무 데이터 수집기")
+    parser.add_argument(
+        "--dry-run", action="store_true",
+        help="DART API를 호출하지 않고 수집 계획(예상 호출 수)만 출력"
+    )
+    parser.add_argument(
+        "--budget", type=int, default=None,
+        help="사용할 호출 수 (기본: 오늘 남은 호출 수 = MAX_CALLS - used_calls)"
+    )
+    parser.add_argument(
+        "--fetch-restated", action="store_true",
+        help="전기/전전기 금액으로 파생 가능한 과거 연도도 해당 연도 보고서(재작성 전 원본)를 직접 조회"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
     start = datetime.now(kst)
     logger.info(f"[시작] 재무 데이터 수집 - {start.isoformat()}")
 
     # DB에 corp_codes가 없다면, corp_codes.csv 파일을 다운로드하여 DB에 저장
-    with engine.connect() as conn:
+    with get_engine().connect() as conn:
         result = conn.execute(text("SELECT COUNT(*) FROM corp_codes")).fetchone()
         if result[0] == 0:
             logger.info("▷ DB에 corp_codes 테이블이 비어있습니다. csv 파일에서 로드하여 저장합니다.")
             corp_codes_df = load_corp_codes_from_csv()  # 필요에 따라 파일 경로 수정
             insert_corp_codes_to_db(corp_codes_df)
-    
+
+    # UNIVERSE_SOURCE('krx' 또는 상장 목록 파일)가 있으면 상장/상장폐지 상태 동기화
+    # (실패해도 기존 상장 상태로 계속 수집)
+    if setting("UNIVERSE_SOURCE"):
+        try:
+            sync_universe(dry_run=args.dry_run)
+        except Exception:
+            logger.exception("▷ 상장 종목 동기화 실패 - 기존 상장 상태로 진행")
+
     # 전체 corp_code 목록 조회
     codes = fetch_all_corp_codes()
     df = pd.DataFrame(codes)
     df["stock_code"] = df["stock_code"].astype(str).str.zfill(6)
 
     # TARGET_TICKERS 환경변수 필터링 (없으면 전체)
-    targets = [t.strip() for t in os.getenv("TARGET_TICKERS","").split(",") if t.strip()]
+    targets = setting_list("TARGET_TICKERS")
     if targets:
         df = df[df["stock_code"].isin(targets)]
 
     mapping = df.set_index("stock_code")["corp_code"].to_dict()
     names   = df.set_index("stock_code")["corp_name"].to_dict()
-    tickers = sorted(mapping.keys())
-    years   = list(range(datetime.now(kst).year - 1,
-                         datetime.now(kst).year - 6, -1))
-
-    # 주식 데이터를 수집
-    for idx, tkr in enumerate(tickers, start=1):
-        corp = mapping[tkr]
-        name = names[tkr]
-
-        for yr in years:
-            logger.info(f"=== [{idx}/{len(tickers)}] {tkr} ({name}) ===")
-            logger.info(f" ▶ {tkr} | 사업연도 {yr} ({name})")
-
-            # 캐시 확인
-            cached = load_cached(corp, yr)
-            if cached and cached["fs_div"] == "CFS":
-                logger.info("    ✓ CFS 캐시 존재 → 스킵")
-                continue
-
-            # DART API 호출
-            recs, rpt, fdiv = fetch_latest_for_year(corp, tkr, yr)
-
-            # 결과 헤더: report_code, fs_div 한글명
-            rpt_name = RPT_MAP.get(rpt, rpt)
-            fs_name  = FS_MAP.get(fdiv, fdiv)
-            logger.info(f"    ▶ [{rpt_name}, {fs_name}] 조회 완료")
-
-            if not recs:
-                logger.warning("    ■ 공시 없음")
-                continue
-
-            # 캐시 저장
-            save_cache(corp, name, tkr, yr, recs, rpt, fdiv)
-
-            # RAW upsert
-            raw_sql = """
-                INSERT INTO raw_financials(
-                  corp_name, ticker, year, report_code, fs_div,
-                  account_id, account_nm,
-                  thstrm_amount, frmtrm_amount, bfefrm_amount,
-                  created_at
-                ) VALUES (
-                  :cn, :tk, :yr, :rp, :fd,
-                  :aid, :anm,
-                  :ta, :fa, :ba,
-                  NOW()
-                )
-                ON CONFLICT(ticker, year, report_code, fs_div, account_id)
-                DO NOTHING;
-            """
-            cnt = 0
-            with engine.begin() as conn:
-                for r in recs:
-                    conn.execute(text(raw_sql), {
-                        "cn": name, "tk": tkr, "yr": yr,
-                        "rp": rpt, "fd": fdiv,
-                        "aid": r["account_id"],
-                        "anm": r["account_nm"],
-                        "ta":  r.get("thstrm_amount") or None,
-                        "fa":  r.get("frmtrm_amount") or None,
-                        "ba":  r.get("bfefrm_amount") or None
-                    })
-                    cnt += 1
-            logger.info(f"    ✓ RAW upsert 완료 ({cnt}건)")
-
-            # 분석 지표 계산
-            logger.info("▷ 재무 분석 지표 계산 시작")
-            
-            # SUMMARY upsert
-            # recs 데이터를 pandas DataFrame으로 변환
-            df_r = pd.DataFrame(recs)
-            df_r["amount"] = pd.to_numeric(df_r["thstrm_amount"], errors="coerce")
-
-            # 부채 총액 계산 (Liabilities 관련 계정)
-            liab = df_r[df_r["account_nm"].str.contains(r"부채|Liabilities", na=False)]["amount"].sum()
-
-            # 자본 총액 계산 (Equity 관련 계정)
-            eq = df_r[(df_r["account_id"] == "ifrs-full_Equity") |
-                      (df_r["account_nm"].str.contains(r"자본총계|Equity", na=False))]["amount"].sum()
-
-            # 지배기업 자본 총액 계산 (지배기업 관련 계정, 없으면 기본 자본 총액으로 대체)
-            eqp = df_r[df_r["account_nm"].str.contains(r"지배기업", na=False)]["amount"].sum() or eq
-
-            # 재무 비율 계산 (영업이익률, ROE 등)
-            ops = compute_ratios(df_r, tkr)
-
-            # 부채비율 계산 (자본 대비 부채 비율)
-            dr = (liab / (liab + eq) * 100) if (liab + eq) > 0 else None
-
-            # 지배기업 부채비율 계산 (지배기업 자본 대비 부채 비율)
-            
-            cr = (liab / eqp * 100) if eqp > 0 else None
-            # numpy 타입일 경우 float 변환
-            if dr is not None: dr = float(dr)
-            if cr is not None: cr = float(cr)
-            om = ops.get("operating_margin")
-            roe = ops.get("roe")
-            
-            # SUMMARY upsert (update or insert)
-            update_sql = text("""
-                UPDATE summary_financials
-                SET operating_margin = :om,
-                    roe = :roe,
-                    debt_ratio = :dr,
-                    controlling_debt_ratio = :cr
-                WHERE ticker = :tk AND year = :yr AND report_code = :rp AND fs_div = :fd
-            """)
-            insert_sql = text("""
-                INSERT INTO summary_financials(
-                corp_name, ticker, year, report_code, fs_div,
-                operating_margin, roe, debt_ratio, controlling_debt_ratio, created_at
-                ) VALUES (
-                :cn, :tk, :yr, :rp, :fd,
-                :om, :roe, :dr, :cr, NOW()
-                )
-            """)
-            with engine.begin() as conn:
-                # 먼저 업데이트 시도
-                result = conn.execute(update_sql, {
-                    "om": om, "roe": roe, "dr": dr, "cr": cr,
-                    "tk": tkr, "yr": yr, "rp": rpt, "fd": fdiv
-                })
-                # 행이 없으면 새로 삽입
-                if result.rowcount == 0:
-                    conn.execute(insert_sql, {
-                        "cn": name, "tk": tkr, "yr": yr,
-                        "rp": rpt, "fd": fdiv,
-                        "om": om, "roe": roe, "dr": dr, "cr": cr
-                    })
+    # 상장 기간 밖의 연도·보고서는 수집 계획에서 제외 (상장폐지 종목은 상장 중이던 연도만)
+    periods = {
+        r.stock_code: (
+            r.listed_date if pd.notna(r.listed_date) else None,
+            r.delisted_date if pd.notna(r.delisted_date) else None,
+        )
+        for r in df.itertuples(index=False)
+    }
+    # 상장폐지됐지만 상장폐지일을 모르는 종목 (첫 동기화 전에 이미 목록에서 빠진 회사)
+    unknown_delisted = {
+        r.stock_code for r in df.itertuples(index=False)
+        if pd.notna(r.is_listed) and not r.is_listed and pd.isna(r.delisted_date)
+    }
+    now     = datetime.now(kst)
+    years   = list(range(now.year - 1, now.year - 6, -1))
+
+    # COLLECT_MODE 환경변수: full(기본, 전체 재무제표) / headline(주요계정 일괄)
+    mode = (setting("COLLECT_MODE", "full") or "full").strip().lower()
+    logger.info(f"▷ 수집 모드: {mode}")
+
+    # 남은 일일 호출 수를 보고서·종목 우선순위(관심종목 → 최신연도 → 보고서 → 시가총액)대로 배분
+    plan = make_plan(mapping, years, now.year, mode, budget=args.budget,
+                     derive=not args.fetch_restated, periods=periods,
+                     unknown_delisted=unknown_delisted)
+    for line in describe(plan).splitlines():
+        logger.info(f"▷ {line}")
+    if args.dry_run:
+        logger.info("▷ --dry-run: API 호출 없이 종료")
+        return
+
+    stats = PipelineStats()
+    try:
+        if mode == "full":
+            stats = collect_full(plan.items, names)
+        else:
+            stats = collect_headline(plan.items, names)
+    finally:
+        # 중단(호출 한도·오류)돼도 이미 커밋된 종목은 대시보드 payload 재생성
+        touched = stats.touched
+        refresh_payloads(touched)
+
+        # 업종코드(미조회 회사만) 캐시 후, 바뀐 종목이 속한 업종 그룹만 재집계
+        classified = update_industry_codes(touched)
+        refresh_sector_stats(set(touched) | set(classified))
+
+    if stats.error is not None:
+        raise stats.error
 
     end = datetime.now(kst)
     logger.info(f"[완료] 재무 데이터 수집 - {end.isoformat()} (소요 시간: {end - start})")
 
 # main 함수 실행
 if __name__ == "__main__":
+    logging.basicConfig(
+        format="%(asctime)s [%(levelname)s] %(message)s",
+        level=logging.INFO  # 로그 레벨을 INFO로 설정
+    )
     try:
         main()
     except Exception:
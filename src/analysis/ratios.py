@@ -1,41 +1,59 @@
 # src/analysis/ratios.py
 
-import pandas as pd
 import logging
-from typing import Dict
+from typing import TYPE_CHECKING, Dict, List, Optional, Union
+
+from src.utils.amounts import ParsedStatement, as_statement
+
+# pandas 는 as_statement().to_frame() 에서 import (수집기/API 모듈 import 시간 단축)
+if TYPE_CHECKING:
+    import pandas as pd
 
 logger = logging.getLogger(__name__)
 
-def compute_ratios(df_raw: pd.DataFrame, ticker: str) -> Dict[str, float]:
+def compute_ratios(df_raw: Union[ParsedStatement, 'pd.DataFrame'], ticker: str) -> Dict[str, Optional[float]]:
     """
-    재무제표 raw DataFrame에서 주요 비율 계산:
+    재무제표(ParsedStatement 또는 raw DataFrame)에서 주요 비율 계산:
       - operating_margin    : 영업이익률 (%) = 영업이익 / 매출액 * 100
       - roe                 : ROE (%)      = 당기순이익 / 자본총계 * 100
       - debt_ratio          : 부채비율 (%)   = 총부채 / (총부채 + 자본총계) * 100
       - controlling_debt_ratio : 지배주주 D/E (%) = 총부채 / 지배주주지분 * 100
+    입력 계정이 재무제표에 없으면(파생 연도의 전기/전전기 금액 결측 등) 해당 지표는 None 입니다.
     """
 
-    df = df_raw.copy()
-    df['amount'] = pd.to_numeric(df['thstrm_amount'], errors='coerce')
+    # 금액은 수집 시 파싱된 int64 컬럼 사용 (DataFrame 이면 여기서 한 번만 파싱)
+    df = as_statement(df_raw).to_frame()
 
     # 계정 코드별 합계
     pivot_id = df.groupby('account_id')['amount'].sum()
     pivot_nm = df.groupby('account_nm')['amount'].sum()
 
-    def get_metric(id_keys, nm_keys):
+    def get_metric(id_keys, nm_keys) -> Optional[float]:
+        found = False
         # 우선 account_id
         for ik in id_keys:
-            if ik in pivot_id and pivot_id[ik] != 0:
-                return float(pivot_id[ik])
+            if ik in pivot_id:
+                found = True
+                if pivot_id[ik] != 0:
+                    return float(pivot_id[ik])
         # 다음 account_nm (완전일치 → 부분일치)
         for nk in nm_keys:
-            if nk in pivot_nm and pivot_nm[nk] != 0:
-                return float(pivot_nm[nk])
+            if nk in pivot_nm:
+                found = True
+                if pivot_nm[nk] != 0:
+                    return float(pivot_nm[nk])
         for nk in nm_keys:
             for acct, val in pivot_nm.items():
-                if nk.lower() in acct.lower() and val != 0:
-                    return float(val)
-        return 0.0  # 없으면 0으로 내려보냄
+                if nk.lower() in acct.lower():
+                    found = True
+                    if val != 0:
+                        return float(val)
+        # 계정은 있지만 0 이면 0, 계정 자체가 없으면 None (결측을 0 으로 취급하지 않음)
+        return 0.0 if found else None
+
+    def total(values) -> Optional[float]:
+        values = [v for v in values if v is not None]
+        return sum(values) if values else None
 
     # key lists
     LIABILITY_IDS = [
@@ -53,16 +71,17 @@ def compute_ratios(df_raw: pd.DataFrame, ticker: str) -> Dict[str, float]:
     sales_val = get_metric(['ifrs-full_Revenue'], ['매출액', '수익'])
     op_val    = get_metric(['ifrs-full_OperatingProfitLoss', 'dart_OperatingIncomeLoss'], ['영업이익'])
     net_val   = get_metric(['ifrs-full_ProfitLoss'], ['당기순이익', '순이익'])
-    debt_val  = sum(get_metric([l], []) for l in LIABILITY_IDS)
-    eq_total  = sum(get_metric([e], []) for e in EQUITY_IDS)
+    debt_val  = total(get_metric([l], []) for l in LIABILITY_IDS)
+    eq_total  = total(get_metric([e], []) for e in EQUITY_IDS)
     # 지배주주지분: 만약 별도 항목 없으면 전체 자본 사용
     eq_parent = get_metric(['ifrs-full_EquityAttributableToOwnersOfParent'], []) or eq_total
 
-    # 비율 계산
-    operating_margin       = round(op_val  / sales_val * 100, 2) if sales_val else None
-    roe                    = round(net_val / eq_total * 100,     2) if eq_total else None
-    debt_ratio             = round(debt_val / (debt_val + eq_total) * 100, 2) if (debt_val + eq_total) else None
-    controlling_debt_ratio = round(debt_val / eq_parent * 100, 2)             if eq_parent else None
+    # 비율 계산 (분자·분모 계정이 모두 있을 때만)
+    operating_margin       = round(op_val  / sales_val * 100, 2) if sales_val and op_val is not None else None
+    roe                    = round(net_val / eq_total * 100,     2) if eq_total and net_val is not None else None
+    debt_ratio             = round(debt_val / (debt_val + eq_total) * 100, 2) \
+        if debt_val is not None and eq_total is not None and (debt_val + eq_total) else None
+    controlling_debt_ratio = round(debt_val / eq_parent * 100, 2) if eq_parent and debt_val is not None else None
 
     logger.debug(
         f"{ticker} ratios → OM:{operating_margin}, ROE:{roe}, "
@@ -75,3 +94,54 @@ def compute_ratios(df_raw: pd.DataFrame, ticker: str) -> Dict[str, float]:
         "debt_ratio":             debt_ratio,
         "controlling_debt_ratio": controlling_debt_ratio
     }
+
+
+def summarize_financials(
+    recs: Union[ParsedStatement, List[Dict]],
+    ticker: str
+) -> Dict[str, Optional[float]]:
+    """
+    수집된 재무제표(ParsedStatement 또는 recs)로 summary_financials 한 행의 지표를 계산합니다.
+      - operating_margin, roe : compute_ratios 결과 사용
+      - debt_ratio            : 부채 관련 계정 합 / (부채 + 자본총계) * 100
+      - controlling_debt_ratio: 부채 관련 계정 합 / 지배기업 자본 * 100
+    전체 재무제표(fnlttSinglAcntAll)와 주요계정(fnlttMultiAcnt) 레코드 모두 사용 가능합니다.
+    부채 또는 자본 계정이 없으면 부채비율은 0 이 아니라 None 입니다.
+    """
+    stmt = as_statement(recs)
+    df_r = stmt.to_frame()
+
+    # 부채 총액 계산 (Liabilities 관련 계정)
+    liab_rows = df_r[df_r["account_nm"].str.contains(r"부채|Liabilities", na=False)]["amount"].dropna()
+    liab = liab_rows.sum()
+
+    # 자본 총액 계산 (Equity 관련 계정)
+    eq_rows = df_r[(df_r["account_id"] == "ifrs-full_Equity") |
+                   (df_r["account_nm"].str.contains(r"자본총계|Equity", na=False))]["amount"].dropna()
+    eq = eq_rows.sum()
+
+    # 지배기업 자본 총액 계산 (지배기업 관련 계정, 없으면 기본 자본 총액으로 대체)
+    eqp = df_r[df_r["account_nm"].str.contains(r"지배기업", na=False)]["amount"].sum() or eq
+
+    # 재무 비율 계산 (영업이익률, ROE 등)
+    ops = compute_ratios(stmt, ticker)
+
+    # 부채·자본 계정이 없으면(해당 기간 금액 결측) 비율을 만들지 않음
+    if liab_rows.empty or eq_rows.empty:
+        dr = cr = None
+    else:
+        # 부채비율 계산 (자본 대비 부채 비율)
+        dr = (liab / (liab + eq) * 100) if (liab + eq) > 0 else None
+
+        # 지배기업 부채비율 계산 (지배기업 자본 대비 부채 비율)
+        cr = (liab / eqp * 100) if eqp > 0 else None
+    # numpy 타입일 경우 float 변환
+    if dr is not None: dr = float(dr)
+    if cr is not None: cr = float(cr)
+
+    return {
+        "operating_margin":       ops.get("operating_margin"),
+        "roe":                    ops.get("roe"),
+        "debt_ratio":             dr,
+        "controlling_debt_ratio": cr
+    }
@@ -0,0 +1,105 @@
+# src/analysis/sector_stats.py
+#
+# 업종별 지표 집계 (sector_stats)
+#   - 업종 = corp_codes.induty_code(KSIC) 앞 SECTOR_DIGITS 자리
+#   - (업종, 연도, 보고서, 재무제표 구분, 지표) 그룹마다 기업 수 / 평균 / 사분위수(p25, 중앙값, p75)
+#   - 수집기가 바꾼 종목이 속한 그룹만 다시 계산 (전체 재집계 없음)
+#   - 대시보드는 기본키 조회 한 번으로 동종업계 기준값을 얻음
+import logging
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import text
+
+from src.utils.db import get_engine, fetch_dataframe
+
+logger = logging.getLogger(__name__)
+
+# KSIC 소분류(3자리) 기준 업종
+SECTOR_DIGITS = 3
+# 집계 대상 지표 (summary_financials 컬럼)
+SECTOR_METRICS = ["operating_margin", "roe", "debt_ratio"]
+
+
+def sector_of(induty_code: Optional[str]) -> Optional[str]:
+    """
+    업종코드를 집계 단위(앞 SECTOR_DIGITS 자리)로 줄입니다. 코드가 없으면(None / NaN) None.
+    """
+    import pandas as pd
+    if induty_code is None or pd.isna(induty_code):
+        return None
+    code = str(induty_code).strip()
+    return code[:SECTOR_DIGITS] if code else None
+
+
+# 변경 종목이 속한 (업종, 연도, 보고서, 구분) 그룹
+_AFFECTED_GROUPS = """
+    SELECT DISTINCT LEFT(c.induty_code, :digits) AS sector, s.year, s.report_code, s.fs_div
+      FROM summary_financials s
+      JOIN corp_codes c ON c.stock_code = s.ticker
+     WHERE s.ticker = ANY(:tickers)
+       AND c.induty_code IS NOT NULL AND c.induty_code <> ''
+"""
+
+_METRIC_VALUES = ", ".join(f"('{m}', s.{m})" for m in SECTOR_METRICS)
+
+
+def refresh_sector_stats(tickers: Iterable[str]) -> int:
+    """
+    tickers 가 속한 업종 그룹만 summary_financials 에서 다시 집계해 sector_stats 를 교체합니다.
+    (그룹 안 기업 수만큼만 읽음) 갱신된 (그룹 × 지표) 행 수를 반환합니다.
+    """
+    tickers = sorted(set(tickers))
+    if not tickers:
+        return 0
+    params = {"tickers": tickers, "digits": SECTOR_DIGITS}
+    with get_engine().begin() as conn:
+        # 멤버가 모두 빠진 그룹의 이전 집계가 남지 않도록 먼저 삭제
+        conn.execute(text(f"""
+            DELETE FROM sector_stats t
+             USING ({_AFFECTED_GROUPS}) g
+             WHERE t.sector = g.sector AND t.year = g.year
+               AND t.report_code = g.report_code AND t.fs_div = g.fs_div
+        """), params)
+        result = conn.execute(text(f"""
+            WITH g AS ({_AFFECTED_GROUPS}),
+            m AS (
+                SELECT g.sector, s.year, s.report_code, s.fs_div, v.metric, v.value
+                  FROM g
+                  JOIN corp_codes c ON LEFT(c.induty_code, :digits) = g.sector
+                  JOIN summary_financials s
+                    ON s.ticker = c.stock_code AND s.year = g.year
+                   AND s.report_code = g.report_code AND s.fs_div = g.fs_div
+                 CROSS JOIN LATERAL (VALUES {_METRIC_VALUES}) AS v(metric, value)
+                 WHERE v.value IS NOT NULL AND v.value <> 'NaN'::float8
+            )
+            INSERT INTO sector_stats(sector, year, report_code, fs_div, metric, n, mean, p25, median, p75, updated_at)
+            SELECT sector, year, report_code, fs_div, metric,
+                   COUNT(*), AVG(value),
+                   percentile_cont(0.25) WITHIN GROUP (ORDER BY value),
+                   percentile_cont(0.5)  WITHIN GROUP (ORDER BY value),
+                   percentile_cont(0.75) WITHIN GROUP (ORDER BY value),
+                   NOW()
+              FROM m
+             GROUP BY sector, year, report_code, fs_div, metric
+            ON CONFLICT (sector, year, report_code, fs_div, metric) DO UPDATE SET
+              n = EXCLUDED.n, mean = EXCLUDED.mean,
+              p25 = EXCLUDED.p25, median = EXCLUDED.median, p75 = EXCLUDED.p75,
+              updated_at = EXCLUDED.updated_at
+        """), params)
+    logger.info(f"▷ 업종 집계 갱신 {result.rowcount}건 (대상 종목 {len(tickers)}개)")
+    return result.rowcount
+
+
+def load_sector_benchmark(sector: str, year: int, report_code: str, fs_div: str) -> Dict[str, Dict]:
+    """
+    업종 그룹의 지표별 집계 {metric: {n, mean, p25, median, p75}} 를 반환합니다. (기본키 조회)
+    """
+    if not sector:
+        return {}
+    df = fetch_dataframe("""
+        SELECT metric, n, mean, p25, median, p75
+          FROM sector_stats
+         WHERE sector = :s AND year = :y AND report_code = :r AND fs_div = :f
+    """, {"s": sector, "y": int(year), "r": report_code, "f": fs_div})
+    return {r.metric: {"n": int(r.n), "mean": r.mean, "p25": r.p25, "median": r.median, "p75": r.p75}
+            for r in df.itertuples(index=False)}
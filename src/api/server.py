@@ -0,0 +1,370 @@
+# src/api/server.py
+#
+# 읽기 전용 JSON API (표준 라이브러리 ThreadingHTTPServer)
+#   python -m src.api.server --port 8000
+#
+#   GET /health
+#   GET /companies/{ticker}/summary[?year=&report_code=&fs_div=]      요약 지표
+#   GET /companies/{ticker}/raw?year=&report_code=11011&fs_div=CFS    원본 재무제표 (원 단위 정수)
+#   GET /companies/{ticker}/trend?metric=roe[&report_code=&fs_div=]   연도별 지표 추이
+#   GET /screener?year=&report_code=&fs_div=&roe_min=&debt_ratio_max=&operating_margin_min=&sector=&limit=
+#
+# 캐시
+#   - 응답마다 원본 테이블의 변경 시각(= 데이터 변경 watermark)으로 ETag / Last-Modified 를 붙이고,
+#     If-None-Match / If-Modified-Since 가 맞으면 304 반환
+#     (종목: dart_cache.last_updated / summary_financials.updated_at 중 최신,
+#      /screener: 전체 summary_financials.updated_at + 업종코드 조회 시각 corp_codes.induty_checked_at)
+#     watermark 가 없으면(데이터 없음) ETag / Last-Modified 를 붙이지 않고 캐시하지 않음
+#   - watermark 는 API_WATERMARK_TTL 초 동안, 응답 본문은 watermark 가 바뀔 때까지 프로세스 내 LRU 에 보관
+#     → 같은 요청이 반복되면 DB 를 조회하지 않음
+import sys
+import json
+import time
+import hashlib
+import logging
+import argparse
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from sqlalchemy import text
+
+from src.utils.config import setting
+from src.utils.db import get_engine, fetch_dataframe
+from src.analysis.sector_stats import SECTOR_DIGITS
+
+logger = logging.getLogger(__name__)
+
+# 기본값 (API_WATERMARK_TTL / API_CACHE_SIZE / API_MAX_AGE 환경변수)
+DEFAULT_WATERMARK_TTL = 5.0
+DEFAULT_CACHE_SIZE = 1024
+DEFAULT_MAX_AGE = 60
+SCREENER_MAX_LIMIT = 500
+# /screener 응답의 watermark 대상 키 (전체 지표 + 업종코드)
+SCREENER_MARK = "/screener"
+METRICS = ["operating_margin", "roe", "debt_ratio", "controlling_debt_ratio"]
+
+
+class ApiError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _param(query: Dict, name: str, default=None, cast: Callable = str, required: bool = False):
+    values = query.get(name)
+    if not values or values[0] == "":
+        if required:
+            raise ApiError(400, f"'{name}' 파라미터가 필요합니다.")
+        return default
+    try:
+        return cast(values[0])
+    except ValueError:
+        raise ApiError(400, f"'{name}' 값이 올바르지 않습니다: {values[0]}")
+
+
+def _ticker(value: str) -> str:
+    if not value.isdigit() or len(value) > 6:
+        raise ApiError(400, f"종목코드가 올바르지 않습니다: {value}")
+    return value.zfill(6)
+
+
+def _records(df) -> list:
+    """
+    DataFrame → JSON 직렬화 가능한 레코드 (NaN → null, numpy/날짜 → 기본 타입)
+    """
+    df = df.astype(object).where(df.notna(), None)
+    return [
+        {k: (v.item() if hasattr(v, "item") else v.isoformat() if isinstance(v, (date, datetime)) else v)
+         for k, v in r.items()}
+        for r in df.to_dict(orient="records")
+    ]
+
+
+# ─── 라우트 ────────────────────────────────────────────────────────────────
+def company_summary(ticker: str, query: Dict) -> Dict:
+    conds, params = ["ticker = :t"], {"t": ticker}
+    for name, col, cast in [("year", "year", int), ("report_code", "report_code", str), ("fs_div", "fs_div", str)]:
+        value = _param(query, name, cast=cast)
+        if value is not None:
+            conds.append(f"{col} = :{name}")
+            params[name] = value
+    df = fetch_dataframe(f"""
+        SELECT corp_name, year, report_code, fs_div,
+               operating_margin, roe, debt_ratio, controlling_debt_ratio, derived_from
+          FROM summary_financials
+         WHERE {" AND ".join(conds)}
+         ORDER BY year DESC, report_code, fs_div
+    """, params)
+    if df.empty:
+        raise ApiError(404, f"{ticker} 요약 데이터가 없습니다.")
+    return {"ticker": ticker, "summary": _records(df)}
+
+
+def company_raw(ticker: str, query: Dict) -> Dict:
+    params = {
+        "t": ticker,
+        "y": _param(query, "year", cast=int, required=True),
+        "r": _param(query, "report_code", "11011"),
+        "f": _param(query, "fs_div", "CFS"),
+    }
+    df = fetch_dataframe("""
+        SELECT a.account_id, a.account_nm,
+               r.thstrm_amount, r.frmtrm_amount, r.bfefrm_amount, r.derived_from
+          FROM raw_financials r
+          JOIN account_dim a ON a.account_key = r.account_key
+         WHERE r.ticker = :t AND r.year = :y AND r.report_code = :r AND r.fs_div = :f
+         ORDER BY r.account_key
+    """, params)
+    if df.empty:
+        raise ApiError(404, f"{ticker} {params['y']} 원본 재무제표가 없습니다.")
+    return {"ticker": ticker, "year": params["y"], "report_code": params["r"], "fs_div": params["f"],
+            "accounts": _records(df)}
+
+
+def company_trend(ticker: str, query: Dict) -> Dict:
+    metric = _param(query, "metric", "roe")
+    if metric not in METRICS:
+        raise ApiError(400, f"metric 은 {METRICS} 중 하나여야 합니다.")
+    params = {"t": ticker, "r": _param(query, "report_code", "11011"), "f": _param(query, "fs_div", "CFS")}
+    df = fetch_dataframe(f"""
+        SELECT year, {metric} AS value, derived_from
+          FROM summary_financials
+         WHERE ticker = :t AND report_code = :r AND fs_div = :f
+         ORDER BY year
+    """, params)
+    if df.empty:
+        raise ApiError(404, f"{ticker} 추이 데이터가 없습니다.")
+    return {"ticker": ticker, "metric": metric, "report_code": params["r"], "fs_div": params["f"],
+            "series": _records(df)}
+
+
+def screener(query: Dict) -> Dict:
+    params = {
+        "y": _param(query, "year", datetime.now().year - 1, int),
+        "r": _param(query, "report_code", "11011"),
+        "f": _param(query, "fs_div", "CFS"),
+        "n": min(_param(query, "limit", 100, int), SCREENER_MAX_LIMIT),
+    }
+    if params["n"] < 1:
+        raise ApiError(400, "limit 은 1 이상이어야 합니다.")
+    conds = ["s.year = :y", "s.report_code = :r", "s.fs_div = :f"]
+    for metric in ["operating_margin", "roe", "debt_ratio"]:
+        for suffix, op in [("min", ">="), ("max", "<=")]:
+            value = _param(query, f"{metric}_{suffix}", cast=float)
+            if value is not None:
+                conds.append(f"s.{metric} {op} :{metric}_{suffix}")
+                params[f"{metric}_{suffix}"] = value
+    sector = _param(query, "sector")
+    if sector:
+        conds.append("LEFT(c.induty_code, :digits) = :sector")
+        params.update(sector=sector, digits=SECTOR_DIGITS)
+    order = _param(query, "order", "roe")
+    if order not in METRICS:
+        raise ApiError(400, f"order 는 {METRICS} 중 하나여야 합니다.")
+    df = fetch_dataframe(f"""
+        SELECT s.ticker, s.corp_name, LEFT(c.induty_code, {SECTOR_DIGITS}) AS sector,
+               s.operating_margin, s.roe, s.debt_ratio, s.controlling_debt_ratio, s.derived_from
+          FROM summary_financials s
+          LEFT JOIN corp_codes c ON c.stock_code = s.ticker
+         WHERE {" AND ".join(conds)}
+         ORDER BY s.{order} DESC NULLS LAST, s.ticker
+         LIMIT :n
+    """, params)
+    return {"year": params["y"], "report_code": params["r"], "fs_div": params["f"],
+            "count": len(df), "results": _records(df)}
+
+
+def route(path: str, query: Dict) -> Tuple[Callable[[], Dict], Optional[str]]:
+    """
+    경로를 (응답 생성 함수, watermark 대상) 로 변환합니다. 대상은 ticker 또는 SCREENER_MARK.
+    """
+    parts = [p for p in path.split("/") if p]
+    if parts == ["screener"]:
+        return (lambda: screener(query)), SCREENER_MARK
+    if len(parts) == 3 and parts[0] == "companies":
+        ticker = _ticker(parts[1])
+        handlers = {"summary": company_summary, "raw": company_raw, "trend": company_trend}
+        if parts[2] in handlers:
+            return (lambda: handlers[parts[2]](ticker, query)), ticker
+    raise ApiError(404, f"알 수 없는 경로: {path}")
+
+
+# ─── watermark / 응답 캐시 ────────────────────────────────────────────────────
+def data_watermark(target: Optional[str]) -> Optional[datetime]:
+    """
+    응답 데이터의 마지막 변경 시각을 응답이 읽는 원본 테이블에서 구합니다. (데이터가 없으면 None)
+      - ticker       : 원본 보고서 변경 시각 MAX(dart_cache.last_updated) 와
+                       지표 갱신 시각 MAX(summary_financials.updated_at) 중 최신 (/raw, /summary, /trend)
+      - SCREENER_MARK: 전체 MAX(summary_financials.updated_at) 와 MAX(corp_codes.induty_checked_at) 중 최신
+    """
+    with get_engine().connect() as conn:
+        if target == SCREENER_MARK:
+            return conn.execute(text("""
+                SELECT GREATEST(
+                  (SELECT MAX(updated_at) FROM summary_financials),
+                  (SELECT MAX(induty_checked_at) FROM corp_codes)
+                )
+            """)).scalar()
+        return conn.execute(text("""
+            SELECT GREATEST(
+              (SELECT MAX(d.last_updated)
+                 FROM dart_cache d
+                 JOIN corp_codes c ON c.corp_code = d.corp_code
+                WHERE c.stock_code = :t),
+              (SELECT MAX(updated_at) FROM summary_financials WHERE ticker = :t)
+            )
+        """), {"t": target}).scalar()
+
+
+class ResponseCache:
+    """
+    watermark(TTL) 와 (요청 키 → watermark, etag, body) LRU. 여러 요청 스레드가 공유합니다.
+    """
+
+    def __init__(self, size: int, ttl: float):
+        self.size, self.ttl = size, ttl
+        self._lock = threading.Lock()
+        self._marks: Dict[Optional[str], Tuple[float, Optional[datetime]]] = {}
+        self._bodies: "OrderedDict[str, Tuple[Optional[datetime], str, bytes]]" = OrderedDict()
+
+    def watermark(self, ticker: Optional[str]) -> Optional[datetime]:
+        now = time.monotonic()
+        with self._lock:
+            hit = self._marks.get(ticker)
+            if hit and now - hit[0] < self.ttl:
+                return hit[1]
+        mark = data_watermark(ticker)
+        with self._lock:
+            self._marks[ticker] = (now, mark)
+            if len(self._marks) > self.size:
+                self._marks.clear()
+        return mark
+
+    def get(self, key: str, mark: Optional[datetime]):
+        with self._lock:
+            hit = self._bodies.get(key)
+            if hit and mark is not None and hit[0] == mark:
+                self._bodies.move_to_end(key)
+                return hit
+        return None
+
+    def put(self, key: str, mark: Optional[datetime], etag: str, body: bytes):
+        if mark is None:
+            return
+        with self._lock:
+            self._bodies[key] = (mark, etag, body)
+            self._bodies.move_to_end(key)
+            while len(self._bodies) > self.size:
+                self._bodies.popitem(last=False)
+
+
+def make_etag(key: str, mark: datetime) -> str:
+    return 'W/"' + hashlib.sha1(f"{key}|{mark.isoformat()}".encode("utf-8")).hexdigest()[:20] + '"'
+
+
+def not_modified(headers, etag: str, mark: datetime) -> bool:
+    inm = headers.get("If-None-Match")
+    if inm:
+        return etag in [t.strip() for t in inm.split(",")] or inm.strip() == "*"
+    ims = headers.get("If-Modified-Since")
+    if ims:
+        try:
+            return mark.replace(microsecond=0) <= parsedate_to_datetime(ims)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    server_version = "FinancialsAPI/1.0"
+    protocol_version = "HTTP/1.1"
+    cache: ResponseCache = None
+    max_age: int = DEFAULT_MAX_AGE
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path.rstrip("/") == "/health":
+            return self._send(200, b'{"status":"ok"}')
+        query = parse_qs(url.query)
+        key = url.path + "?" + "&".join(f"{k}={v[0]}" for k, v in sorted(query.items()))
+        try:
+            build, ticker = route(url.path, query)
+            mark = self.cache.watermark(ticker)
+            if mark is not None and mark.tzinfo is None:
+                mark = mark.replace(tzinfo=timezone.utc)
+            headers = {"Cache-Control": f"public, max-age={self.max_age}"}
+            if mark is None:
+                # 변경 시각을 알 수 없으면 검증자 없이 매번 새로 만듦 (304 / 응답 캐시 없음)
+                body = json.dumps(build(), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+                return self._send(200, body, {**headers, "X-Cache": "miss"})
+            cached = self.cache.get(key, mark)
+            etag = cached[1] if cached else make_etag(key, mark)
+            headers["ETag"] = etag
+            headers["Last-Modified"] = format_datetime(mark.astimezone(timezone.utc), usegmt=True)
+            if not_modified(self.headers, etag, mark):
+                return self._send(304, b"", headers)
+            if cached:
+                return self._send(200, cached[2], {**headers, "X-Cache": "hit"})
+            body = json.dumps(build(), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            self.cache.put(key, mark, etag, body)
+            return self._send(200, body, {**headers, "X-Cache": "miss"})
+        except ApiError as e:
+            body = json.dumps({"error": str(e)}, ensure_ascii=False).encode("utf-8")
+            return self._send(e.status, body)
+        except Exception:
+            logger.exception(f"API 처리 실패: {self.path}")
+            return self._send(500, b'{"error":"internal error"}')
+
+    do_HEAD = do_GET
+
+    def _send(self, status: int, body: bytes, headers: Dict[str, str] = None):
+        self.send_response(status)
+        if status != 304:
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        if body and self.command != "HEAD":
+            self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        logger.debug(fmt % args)
+
+
+def make_server(host: str, port: int) -> ThreadingHTTPServer:
+    ApiHandler.cache = ResponseCache(
+        size=int(setting("API_CACHE_SIZE", DEFAULT_CACHE_SIZE)),
+        ttl=float(setting("API_WATERMARK_TTL", DEFAULT_WATERMARK_TTL)),
+    )
+    ApiHandler.max_age = int(setting("API_MAX_AGE", DEFAULT_MAX_AGE))
+    get_engine()  # 요청 스레드 시작 전에 연결 풀 생성
+    server = ThreadingHTTPServer((host, port), ApiHandler)
+    server.daemon_threads = True
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="재무 데이터 읽기 전용 JSON API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args(argv)
+    server = make_server(args.host, args.port)
+    logger.info(f"▷ API 서버 시작: http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format="%(asctime)s [%(levelname)s] %(message)s", level=logging.INFO)
+    sys.exit(main())
@@ -1,41 +1,48 @@
-import os
 import io
 import zipfile
 import logging
 import xml.etree.ElementTree as ET
-import json
 
-from datetime import datetime
+from datetime import datetime, date, timedelta
 from zoneinfo import ZoneInfo
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple, Union
 
-import requests
-from sqlalchemy import create_engine, text
-from datetime import datetime, date, timedelta   # ← date 추가
+from sqlalchemy import text
 
-from src.utils.db import fetch_dataframe, execute_query
-from dotenv import load_dotenv
+from src.utils.config import require, setting, setting_list
+from src.utils.db import get_engine, fetch_dataframe, execute_query
+from src.utils.storage import upsert_cache, decode_cache_payload
+from src.utils.amounts import ParsedStatement, parse_statement
 
 logger = logging.getLogger(__name__)
-load_dotenv()
 
-# ─── 환경 변수 및 DB 연결 ──────────────────────────────────────────
-DART_API_KEY = os.getenv('DART_API_KEY')
-DATABASE_URL = os.getenv('DATABASE_URL')
-if not DART_API_KEY or not DATABASE_URL:
-    raise RuntimeError("DART_API_KEY 또는 DATABASE_URL이 설정되지 않았습니다.")
-
-engine = create_engine(DATABASE_URL)
+# ─── 환경 변수 ───────────────────────────────────────────────────
+# DART_API_KEY / MAX_CALLS 등은 실제 DART 호출 시점에 읽습니다.
+# (대시보드처럼 DART 를 호출하지 않는 쪽은 API 키 없이도 이 모듈을 import 가능)
 kst    = ZoneInfo("Asia/Seoul")
 
+
+
+class QuotaExceeded(RuntimeError):
+    """
+    오늘 DART 호출 수가 MAX_CALLS 에 도달함 - 오류가 아니라 수집 종료 신호 (남은 작업은 다음 실행으로)
+    """
+
+
 # ─── DART OpenAPI 엔드포인트 & 우선순위 ───────────────────────────
 CORP_CODE_URL       = 'https://opendart.fss.or.kr/api/corpCode.xml'
 DART_LIST_ENDPOINT  = 'https://opendart.fss.or.kr/api/list.json'
 DART_ENDPOINT       = 'https://opendart.fss.or.kr/api/fnlttSinglAcntAll.json'
+DART_MULTI_ENDPOINT = 'https://opendart.fss.or.kr/api/fnlttMultiAcnt.json'
+DART_COMPANY_ENDPOINT = 'https://opendart.fss.or.kr/api/company.json'
 REPORT_CODE         = '11011'         # 연간사업보고서 코드
+# 수집 대상 보고서 코드 기본값 (앞쪽일수록 우선) - 11011 연간, 11014 3분기, 11012 반기, 11013 1분기
+DEFAULT_REPORT_CODES = '11011,11014,11012,11013'
 FS_PRIORITY         = ['CFS', 'OFS']  # 연결 우선 → 개별
-# 하루 최대 호출 수
-MAX_CALLS = int(os.getenv('MAX_CALLS', 19000))
+# 다중회사 주요계정 API 1회 호출당 최대 corp_code 수
+MULTI_BATCH_SIZE    = 100
+# 하루 최대 호출 수 기본값 (MAX_CALLS 환경변수)
+DEFAULT_MAX_CALLS   = 19000
 
 # 재무제표 종류, 공시 코드
 #REPORT_CODE = '11011'         # 연간사업보고서
@@ -45,6 +52,36 @@ MAX_CALLS = int(os.getenv('MAX_CALLS', 19000))
 # 정확한 호출수 계산되니 19,000까지만 돌려도 상관없음.
 #MAX_CALLS = int(os.getenv('MAX_CALLS', 19000))
 
+# 다중회사 주요계정(fnlttMultiAcnt)은 account_id 없이 account_nm만 내려주므로
+# compute_ratios 가 인식하는 IFRS account_id 로 매핑합니다. (공백/(손실) 제거 후 비교)
+HEADLINE_ACCOUNT_IDS = {
+    '유동자산':   'ifrs-full_CurrentAssets',
+    '비유동자산': 'ifrs-full_NoncurrentAssets',
+    '자산총계':   'ifrs-full_Assets',
+    '유동부채':   'ifrs-full_CurrentLiabilities',
+    '비유동부채': 'ifrs-full_NoncurrentLiabilities',
+    '부채총계':   'ifrs-full_Liabilities',
+    '자본금':     'ifrs-full_IssuedCapital',
+    '이익잉여금': 'ifrs-full_RetainedEarnings',
+    '자본총계':   'ifrs-full_Equity',
+    '매출액':     'ifrs-full_Revenue',
+    '영업이익':   'ifrs-full_OperatingProfitLoss',
+    '법인세차감전순이익': 'ifrs-full_ProfitLossBeforeTax',
+    '당기순이익': 'ifrs-full_ProfitLoss',
+}
+
+def get_api_key() -> str:
+    return require('DART_API_KEY')
+
+def get_max_calls() -> int:
+    return int(setting('MAX_CALLS', DEFAULT_MAX_CALLS))
+
+def get_report_codes() -> List[str]:
+    """
+    수집 대상 보고서 코드 (REPORT_CODES 환경변수, 앞쪽일수록 우선)
+    """
+    return setting_list('REPORT_CODES', DEFAULT_REPORT_CODES)
+
 def get_today_kst() -> date:
      """
      UTC 현재 시각에 9시간 더해서 한국 날짜(today)를 얻습니다.
@@ -56,20 +93,35 @@ def init_today_counter():
     스크립트 시작 시 오늘 날짜의 카운터 레코드를 생성합니다.단 가상컴퓨터(서버)시간으로 체크
     """
     today = get_today_kst()
-    with engine.begin() as conn:
+    with get_engine().begin() as conn:
         conn.execute(text(
             "INSERT INTO dart_state(date, used_calls) VALUES (:d, 0) "
             "ON CONFLICT(date) DO NOTHING"
         ), {"d": today})
 
-def fetch(url: str, **kwargs) -> requests.Response:
+def get_remaining_calls() -> int:
+    """
+    오늘(KST) 남은 DART API 호출 수 = MAX_CALLS - used_calls
+    """
+    today = get_today_kst()
+    with get_engine().connect() as conn:
+        row = conn.execute(text(
+            "SELECT used_calls FROM dart_state WHERE date = :d"
+        ), {"d": today}).fetchone()
+    used = row.used_calls if row else 0
+    return max(get_max_calls() - used, 0)
+
+def fetch(url: str, **kwargs) -> "requests.Response":
     """
     API 호출 전 used_calls < MAX_CALLS 확인 & +1,
     호출 실패 시 -1 롤백 처리 (원자적 관리)
     """
+    import requests
+
     today = get_today_kst()
+    max_calls = get_max_calls()
     # 오늘 레코드가 없으면 삽입
-    with engine.begin() as conn:
+    with get_engine().begin() as conn:
         conn.execute(text("""
             INSERT INTO dart_state(date, used_calls)
             VALUES (:d, 0)
@@ -77,19 +129,19 @@ def fetch(url: str, **kwargs) -> requests.Response:
         """), {"d": today})
                      
     # 슬롯 확보
-    with engine.begin() as conn:
+    with get_engine().begin() as conn:
         row = conn.execute(text(f"""
             UPDATE dart_state
                SET used_calls = used_calls + 1
              WHERE date = :d
                AND used_calls < :max_calls
          RETURNING used_calls
-        """), {"d": today, "max_calls": MAX_CALLS}).fetchone()
+        """), {"d": today, "max_calls": max_calls}).fetchone()
 
         if row is None:
             # 한도 초과 직전의 today 값을 로그로 남기고
             print(f"[DEBUG] 한도 초과 발생! 오늘 날짜 = {today!r}")
-            raise RuntimeError(f"DART API 일일 호출 한도({MAX_CALLS}) 초과: date={today}")        
+            raise QuotaExceeded(f"DART API 일일 호출 한도({max_calls}) 초과: date={today}")        
         
     # 실제 요청
     try:
@@ -98,7 +150,7 @@ def fetch(url: str, **kwargs) -> requests.Response:
         return resp
     except Exception:
         # 실패 시 카운트 롤백
-        with engine.begin() as conn:
+        with get_engine().begin() as conn:
             conn.execute(text(
                 "UPDATE dart_state SET used_calls = used_calls - 1 WHERE date = :d"
             ), {"d": today})
@@ -114,7 +166,7 @@ def init_corp_codes():
         logger.info("▷ corp_codes 이미 초기화됨 → 스킵")
         return
     logger.info("▷ corp_codes 테이블 초기화 시작")
-    resp = fetch(CORP_CODE_URL, params={'crtfc_key': DART_API_KEY}, timeout=30)
+    resp = fetch(CORP_CODE_URL, params={'crtfc_key': get_api_key()}, timeout=30)
     bio = io.BytesIO(resp.content)
     with zipfile.ZipFile(bio) as zf:
         xml_bytes = zf.read(zf.namelist()[0])
@@ -133,15 +185,22 @@ def init_corp_codes():
     logger.info("▷ corp_codes 테이블 초기화 완료")
 
 
-def fetch_all_corp_codes() -> List[Dict[str, str]]:
+def fetch_all_corp_codes(listed_only: bool = False) -> List[Dict[str, str]]:
     """
     DB의 corp_codes 테이블에서 법인코드 목록을 조회합니다.
-    (비어 있거나 잘못된 stock_code는 필터링)
+    (비어 있거나 잘못된 stock_code는 필터링, 상장 여부/상장일/상장폐지일 포함)
+    listed_only=True 면 상장폐지된 회사를 제외합니다. (상장 상태 미동기화(NULL)는 포함)
+    NULL 값은 NaN 이 아닌 None 으로 돌려줍니다. (induty_code 등을 문자열/None 으로 다루는 호출 측 기준)
     """
-    df = fetch_dataframe("SELECT corp_code, stock_code, corp_name FROM corp_codes")
+    df = fetch_dataframe(f"""
+        SELECT corp_code, stock_code, corp_name, is_listed, listed_date, delisted_date, induty_code
+          FROM corp_codes
+        {"WHERE is_listed IS DISTINCT FROM FALSE" if listed_only else ""}
+    """)
     df['stock_code'] = df['stock_code'].fillna('').astype(str).str.strip()
     df = df[(df['stock_code'].str.upper() != 'EMPTY') & (df['stock_code'] != '000000')]
     df['stock_code'] = df['stock_code'].str.extract(r'(\d+)')[0].str.zfill(6)
+    df = df.astype(object).where(df.notna(), None)
     return df.to_dict(orient='records')
 
 
@@ -161,7 +220,7 @@ def list_reports_for_year(
         resp = fetch(
             DART_LIST_ENDPOINT,
             params={
-                'crtfc_key':     DART_API_KEY,
+                'crtfc_key':     get_api_key(),
                 'corp_code':     corp_code,
                 'bgn_de':        f"{year}0101",
                 'end_de':        f"{year}1231",
@@ -201,68 +260,72 @@ def save_cache(
     corp_code: str,
     stock_code: str,
     year: int,
-    recs: List[Dict],
+    recs: Union[ParsedStatement, List[Dict]],
     report_code: str,
     fs_div: str
 ):
     """
-    dart_cache 테이블에 JSONB 형태로 재무제표를 upsert 합니다.
+    dart_cache 테이블에 재무제표 원본을 upsert 합니다. (JSONB 또는 zlib 압축, DART_CACHE_PAYLOAD)
     """
-    payload = json.dumps(recs, ensure_ascii=False)
-    with engine.begin() as conn:
-        conn.execute(text("""
-            INSERT INTO dart_cache(
-              corp_code, stock_code, year,
-              report_code, fs_div, recs
-            ) VALUES (
-              :c, :s, :y,
-              :r, :f, :j
-            )
-            ON CONFLICT(corp_code, year, stock_code)
-            DO UPDATE SET
-              report_code  = EXCLUDED.report_code,
-              fs_div        = EXCLUDED.fs_div,
-              recs          = EXCLUDED.recs,
-              last_updated  = NOW()
-        """), {
-            'c': corp_code,
-            's': stock_code,
-            'y': year,
-            'r': report_code,
-            'f': fs_div,
-            'j': payload
-        })
+    with get_engine().begin() as conn:
+        upsert_cache(conn, corp_code, stock_code, year, recs, report_code, fs_div)
 
 
-def fetch_latest_for_year(corp_code: str, stock_code: str, year: int) -> Tuple[List[Dict], str, str]:
+def load_cached_statement(
+    corp_code: str,
+    stock_code: str,
+    year: int,
+    reprt_code: str = REPORT_CODE
+) -> Optional[Tuple[ParsedStatement, str, str]]:
     """
-    1) CFS 캐시 조회 후 존재 시 스킵
-    2) CFS→OFS 순으로 재무제표 API 호출(fetch 사용 → 카운트 증가)
+    (corp_code, year, reprt_code) 의 CFS 캐시가 있으면 (ParsedStatement, report_code, fs_div) 를,
+    없으면(또는 OFS 캐시면) None 을 반환합니다.
     """
-    # 1) 캐시 조회 (corp_code, stock_code, year 로 통일)
-    with engine.connect() as conn:
+    with get_engine().connect() as conn:
         row = conn.execute(text("""
-            SELECT report_code, fs_div, recs
+            SELECT report_code, fs_div, recs, recs_z
               FROM dart_cache
              WHERE corp_code = :c
                AND stock_code = :s
                AND year = :y
-        """), {'c': corp_code, 's': stock_code, 'y': year}).fetchone()
+               AND report_code = :r
+        """), {'c': corp_code, 's': stock_code, 'y': year, 'r': reprt_code}).fetchone()
 
     if row and row.fs_div == 'CFS':
-        logger.info("    ✓ CFS 캐시 존재 → 스킵")
-        recs = row.recs if isinstance(row.recs, (list, dict)) else json.loads(row.recs)
-        return recs, row.report_code, row.fs_div
+        recs = decode_cache_payload(row.recs, row.recs_z) or []
+        return parse_statement(recs), row.report_code, row.fs_div
+    return None
 
-    # 2) API 호출
+
+def cached_content_hash(corp_code: str, year: int, reprt_code: str = REPORT_CODE) -> Optional[str]:
+    """
+    dart_cache 에 저장된 (corp_code, year, reprt_code) 원본의 content_hash. (없으면 None)
+    """
+    with get_engine().connect() as conn:
+        return conn.execute(text("""
+            SELECT content_hash
+              FROM dart_cache
+             WHERE corp_code = :c AND year = :y AND report_code = :r
+        """), {'c': corp_code, 'y': year, 'r': reprt_code}).scalar()
+
+
+def fetch_statement(
+    corp_code: str,
+    year: int,
+    reprt_code: str = REPORT_CODE
+) -> Tuple[ParsedStatement, str, str]:
+    """
+    CFS→OFS 순으로 재무제표 API 를 호출합니다. (fetch 사용 → 카운트 증가, 캐시 저장 없음)
+    응답 금액은 여기서 한 번만 파싱해 ParsedStatement 로 반환하며, 없으면 빈 결과를 반환합니다.
+    """
     for fs_div in FS_PRIORITY:
         resp = fetch(
             DART_ENDPOINT,
             params={
-                'crtfc_key':  DART_API_KEY,
+                'crtfc_key':  get_api_key(),
                 'corp_code':  corp_code,
                 'bsns_year':  year,
-                'reprt_code': REPORT_CODE,
+                'reprt_code': reprt_code,
                 'fs_div':     fs_div,
             },
             timeout=15
@@ -277,10 +340,121 @@ def fetch_latest_for_year(corp_code: str, stock_code: str, year: int) -> Tuple[L
                 'frmtrm_amount': it.get('frmtrm_amount', ''),
                 'bfefrm_amount': it.get('bfefrm_amount', ''),
             } for it in items]
+            return parse_statement(recs), reprt_code, fs_div
+
+    logger.warning(f"{corp_code} {year}: 보고서({reprt_code}) CFS/OFS 모두 없음")
+    return parse_statement([]), '', ''
 
-            # 3) 캐시 저장 (동일한 stock_code 사용)
-            save_cache(corp_code, stock_code, year, recs, REPORT_CODE, fs_div)
-            return recs, REPORT_CODE, fs_div
 
-    logger.warning(f"{corp_code} {year}: 연간사업보고서 CFS/OFS 모두 없음")
-    return [], '', ''
+def fetch_latest_for_year(
+    corp_code: str,
+    stock_code: str,
+    year: int,
+    reprt_code: str = REPORT_CODE
+) -> Tuple[ParsedStatement, str, str]:
+    """
+    1) (corp_code, year, reprt_code) CFS 캐시 조회 후 존재 시 스킵
+    2) CFS→OFS 순으로 재무제표 API 호출(fetch 사용 → 카운트 증가)
+    3) 조회 결과를 dart_cache 에 저장
+    응답 금액은 여기서 한 번만 파싱해 ParsedStatement 로 반환합니다.
+    """
+    # 1) 캐시 조회 (corp_code, stock_code, year, report_code 로 통일)
+    cached = load_cached_statement(corp_code, stock_code, year, reprt_code)
+    if cached is not None:
+        logger.info("    ✓ CFS 캐시 존재 → 스킵")
+        return cached
+
+    # 2) API 호출
+    stmt, rpt, fs_div = fetch_statement(corp_code, year, reprt_code)
+
+    # 3) 캐시 저장 (동일한 stock_code 사용)
+    if len(stmt):
+        save_cache(corp_code, stock_code, year, stmt, rpt, fs_div)
+    return stmt, rpt, fs_div
+
+
+# 기업개황 응답 중 "이 회사는 조회할 데이터가 없음"으로 확정할 수 있는 상태 코드 (013: 조회된 데이터 없음)
+COMPANY_EMPTY_STATUSES = ('013',)
+
+
+def fetch_company_info(corp_code: str) -> Dict[str, str]:
+    """
+    DART 기업개황(company.json)을 조회합니다. (fetch 사용 → 카운트 증가)
+    업종코드(induty_code, KSIC) 등 응답 dict 를 반환하며, 데이터 없음(013)이면 빈 dict.
+    그 밖의 상태(020 요청 제한 초과, 800 점검, 900 오류, 키 오류 등)는 일시적일 수 있으므로
+    RuntimeError 를 발생시킵니다. (호출 측에서 조회 완료로 기록하지 않고 중단)
+    """
+    resp = fetch(
+        DART_COMPANY_ENDPOINT,
+        params={'crtfc_key': get_api_key(), 'corp_code': corp_code},
+        timeout=15
+    )
+    data = resp.json()
+    status = data.get('status')
+    if status in COMPANY_EMPTY_STATUSES:
+        logger.warning(f"{corp_code}: 기업개황 없음 {status} {data.get('message')}")
+        return {}
+    if status != '000':
+        raise RuntimeError(f"{corp_code}: 기업개황 조회 실패 {status} {data.get('message')}")
+    return data
+
+
+def _headline_account_id(account_nm: str) -> str:
+    """
+    주요계정 account_nm 을 IFRS account_id 로 변환합니다. (매핑 없으면 빈 문자열)
+    """
+    key = (account_nm or '').replace(' ', '').replace('(손실)', '')
+    return HEADLINE_ACCOUNT_IDS.get(key, '')
+
+
+def fetch_headline_batch(
+    corp_codes: List[str],
+    year: int,
+    reprt_code: str = REPORT_CODE,
+    tickers: Optional[Dict[str, str]] = None
+) -> Dict[str, Tuple[ParsedStatement, str]]:
+    """
+    다중회사 주요계정 API(fnlttMultiAcnt)로 여러 회사의 주요계정을 한 번에 조회합니다.
+    corp_codes 는 MULTI_BATCH_SIZE 단위로 나누어 호출하며(호출당 카운트 +1),
+    회사별로 FS_PRIORITY(CFS→OFS) 순으로 재무제표 구분을 골라
+    {corp_code: (ParsedStatement, fs_div)} 형태로 반환합니다. (fetch_latest_for_year 와 같은 구조)
+    응답 행에 corp_code 가 없으면 stock_code 로 회사를 찾습니다. (tickers: {corp_code: stock_code})
+    """
+    by_stock = {str(t).zfill(6): c for c, t in (tickers or {}).items()}
+    grouped: Dict[str, Dict[str, List[Dict]]] = {}
+    for i in range(0, len(corp_codes), MULTI_BATCH_SIZE):
+        batch = corp_codes[i:i + MULTI_BATCH_SIZE]
+        resp = fetch(
+            DART_MULTI_ENDPOINT,
+            params={
+                'crtfc_key':  get_api_key(),
+                'corp_code':  ','.join(batch),
+                'bsns_year':  year,
+                'reprt_code': reprt_code,
+            },
+            timeout=30
+        )
+        data = resp.json()
+        if data.get('status') not in ('000', '013'):
+            logger.warning(f"주요계정 조회 실패 {year}: {data.get('status')} {data.get('message')}")
+            continue
+        for it in data.get('list') or []:
+            # 주요계정 금액은 '1,234' 처럼 콤마가 포함되어 내려옴 → parse_statement 에서 처리
+            corp = it.get('corp_code') or by_stock.get((it.get('stock_code') or '').strip().zfill(6), '')
+            if not corp:
+                continue
+            grouped.setdefault(corp, {}).setdefault(it.get('fs_div', ''), []).append({
+                'account_id':    _headline_account_id(it.get('account_nm', '')),
+                'account_nm':    it.get('account_nm', ''),
+                'thstrm_amount': it.get('thstrm_amount', ''),
+                'frmtrm_amount': it.get('frmtrm_amount', ''),
+                'bfefrm_amount': it.get('bfefrm_amount', ''),
+            })
+
+    result = {}
+    for corp_code, by_fs in grouped.items():
+        for fs_div in FS_PRIORITY:
+            if by_fs.get(fs_div):
+                result[corp_code] = (parse_statement(by_fs[fs_div]), fs_div)
+                break
+    return result
@@ -0,0 +1,42 @@
+# src/data_collection/derive.py
+import logging
+from typing import Dict
+
+import numpy as np
+
+from src.data_collection.dart_api import REPORT_CODE
+from src.utils.amounts import ParsedStatement
+
+logger = logging.getLogger(__name__)
+
+# 전기/전전기 금액이 "같은 보고서 기간"의 직전 연도 값인 보고서만 파생 가능
+# (분기·반기 보고서의 재무상태표 frmtrm 은 전년도 "말" 기준이라 제외)
+DERIVABLE_REPORT_CODES = {REPORT_CODE}
+# 한 보고서로 채울 수 있는 과거 연도 수 (frmtrm → year-1, bfefrm → year-2)
+DERIVE_DEPTH = 2
+
+
+def derive_prior_years(stmt: ParsedStatement, year: int, reprt_code: str) -> Dict[int, ParsedStatement]:
+    """
+    year 사업보고서의 전기/전전기 금액 열을 당기 열로 옮겨
+    {year-1: stmt, year-2: stmt} 를 만듭니다. 당기 금액이 결측인 계정은 제외합니다.
+      - year-1: thstrm ← frmtrm, frmtrm ← bfefrm
+      - year-2: thstrm ← bfefrm
+    """
+    if reprt_code not in DERIVABLE_REPORT_CODES:
+        return {}
+
+    n = len(stmt)
+    derived = {}
+    for offset in range(1, DERIVE_DEPTH + 1):
+        # 열을 offset 만큼 왼쪽으로 밀고, 비는 오른쪽 열은 결측 처리
+        amounts = np.zeros_like(stmt.amounts)
+        null = np.ones_like(stmt.null)
+        amounts[:, :-offset] = stmt.amounts[:, offset:]
+        null[:, :-offset] = stmt.null[:, offset:]
+        rows = np.flatnonzero(~null[:, 0])
+        if len(rows):
+            shifted = ParsedStatement(stmt.account_id, stmt.account_nm, amounts, null)
+            derived[year - offset] = shifted.take(rows)
+    logger.debug(f"{year} 보고서({n}계정)에서 파생된 연도: {sorted(derived)}")
+    return derived
@@ -0,0 +1,245 @@
+# src/data_collection/pipeline.py
+#
+# 수집 파이프라인: fetch 워커 N개 → (bounded queue) → write-behind writer 1개
+#   - fetch 워커는 DART 호출·금액 파싱·지표 계산까지 끝낸 결과(FetchResult)를 큐에 넣음
+#   - writer 는 결과를 모아 한 트랜잭션으로 dart_cache / raw_financials / summary_financials 를 씀
+#     → 네트워크 대기와 DB 쓰기가 겹쳐서 진행되고, 배치 단위로 원자적으로 반영됨
+#   - 큐가 가득 차면 워커가 기다리므로(backpressure) 메모리 사용량은 종목 수와 무관하게
+#     (워커 수 + 큐 크기 + 배치 크기) 개 결과로 제한됨
+#   - 캐시 저장과 raw/summary 저장이 같은 트랜잭션이라, 중간에 죽어도
+#     "캐시는 있는데 raw/summary 가 없는" 상태가 남지 않음 (미반영 작업은 다음 실행 계획에 다시 포함)
+import time
+import queue
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from src.utils.amounts import ParsedStatement
+from src.utils.config import setting
+from src.utils.db import get_engine
+from src.utils.storage import insert_raw, touch_cache, upsert_cache, upsert_summary
+from src.data_collection.dart_api import QuotaExceeded
+from src.data_collection.derive import derive_prior_years
+from src.analysis.ratios import summarize_financials
+
+logger = logging.getLogger(__name__)
+
+# 기본값 (COLLECT_WORKERS / WRITE_BATCH_SIZE / WRITE_QUEUE_SIZE / WRITE_FLUSH_SECS 환경변수)
+DEFAULT_WORKERS = 4
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_FLUSH_SECS = 5.0
+
+_DONE = object()
+
+
+@dataclass
+class Statement:
+    """
+    저장할 재무제표 1건 (직접 수집분 또는 전기/전전기 파생분)과 미리 계산한 지표
+    """
+    year: int
+    stmt: ParsedStatement
+    summary: Dict[str, Optional[float]]
+    derived_from: Optional[int] = None
+
+
+@dataclass
+class FetchResult:
+    """
+    fetch 워커 → writer 로 넘기는 (종목, 보고서) 단위 결과
+    write_cache=True 면 statements[0] 원본을 dart_cache 에도 저장합니다. (API 로 새로 받은 경우)
+    unchanged=True 면 재조회 결과가 저장된 원본과 같아 dart_cache.checked_at 만 갱신합니다.
+    """
+    ticker: str
+    corp_code: str
+    corp_name: str
+    reprt_code: str
+    fs_div: str
+    statements: List[Statement] = field(default_factory=list)
+    write_cache: bool = False
+    with_raw: bool = True
+    year: int = 0
+    content_hash: Optional[str] = None
+    unchanged: bool = False
+
+
+@dataclass
+class PipelineStats:
+    """
+    touched 는 커밋까지 끝난 종목만 담습니다. (중단돼도 payload·업종 집계 갱신 대상)
+    error 는 수집을 중단시킨 오류, quota_exhausted 는 일일 호출 한도 도달로 정상 종료한 경우.
+    """
+    results: int = 0
+    unchanged: int = 0
+    batches: int = 0
+    touched: Set[str] = field(default_factory=set)
+    error: Optional[BaseException] = None
+    quota_exhausted: bool = False
+
+
+def prepare(
+    ticker: str,
+    corp_code: str,
+    corp_name: str,
+    year: int,
+    reprt_code: str,
+    fs_div: str,
+    stmt: ParsedStatement,
+    write_cache: bool = False,
+    with_raw: bool = True,
+    derive: bool = True,
+    digest: Optional[str] = None
+) -> FetchResult:
+    """
+    파싱된 재무제표로 지표를 계산하고, 사업보고서면 전기/전전기 파생 연도까지 붙인 결과를 만듭니다.
+    (fetch 워커에서 실행 → writer 는 DB 쓰기만 수행)
+    """
+    statements = [Statement(year, stmt, summarize_financials(stmt, ticker))]
+    if derive:
+        for dyr, dstmt in derive_prior_years(stmt, year, reprt_code).items():
+            statements.append(Statement(dyr, dstmt, summarize_financials(dstmt, ticker), derived_from=year))
+    return FetchResult(
+        ticker=ticker, corp_code=corp_code, corp_name=corp_name,
+        reprt_code=reprt_code, fs_div=fs_div, statements=statements,
+        write_cache=write_cache, with_raw=with_raw, year=year, content_hash=digest
+    )
+
+
+def unchanged(ticker: str, corp_code: str, corp_name: str, year: int, reprt_code: str, fs_div: str) -> FetchResult:
+    """
+    저장된 원본과 같은 재조회 결과 (지표 계산/raw·summary 저장 생략, checked_at 만 갱신)
+    """
+    return FetchResult(
+        ticker=ticker, corp_code=corp_code, corp_name=corp_name,
+        reprt_code=reprt_code, fs_div=fs_div, year=year, unchanged=True
+    )
+
+
+def write_results(conn, results: List[FetchResult]) -> Set[str]:
+    """
+    결과 묶음을 주어진 연결(트랜잭션)에서 저장하고 반영된 종목코드 집합을 반환합니다.
+    원본 해시가 바뀌어 dart_cache 를 갱신한 결과는 직접 수집 raw 행을 지우고 다시 넣습니다. (insert_raw replace)
+    """
+    touched = set()
+    for res in results:
+        if res.unchanged:
+            touch_cache(conn, res.corp_code, res.year, res.reprt_code)
+            continue
+        if res.write_cache and res.statements:
+            head = res.statements[0]
+            changed = upsert_cache(conn, res.corp_code, res.ticker, head.year, head.stmt,
+                                   res.reprt_code, res.fs_div, res.content_hash)
+            if not changed:
+                continue
+        for st in res.statements:
+            if res.with_raw:
+                insert_raw(conn, res.ticker, st.year, res.reprt_code, res.fs_div, st.stmt, st.derived_from,
+                           replace=res.write_cache)
+            upsert_summary(conn, res.corp_name, res.ticker, st.year, res.reprt_code, res.fs_div,
+                           st.summary, st.derived_from)
+        touched.add(res.ticker)
+    return touched
+
+
+def run_pipeline(
+    units: Iterable,
+    fetch_fn: Callable[[object], List[FetchResult]],
+    workers: Optional[int] = None,
+    batch_size: Optional[int] = None,
+    queue_size: Optional[int] = None,
+    flush_secs: Optional[float] = None
+) -> PipelineStats:
+    """
+    units 의 각 작업을 fetch_fn 으로 workers 개 스레드에서 동시에 가져오고,
+    결과를 batch_size 개(또는 flush_secs 경과)마다 한 트랜잭션으로 저장합니다.
+    fetch_fn 에서 예외가 나면 새 작업 배정을 멈추고 이미 받은 결과를 저장합니다.
+    예외는 다시 발생시키지 않고 stats.error 로 돌려주며(커밋된 stats.touched 와 함께),
+    일일 호출 한도 도달(QuotaExceeded)은 오류가 아닌 정상 종료(stats.quota_exhausted)로 처리합니다.
+    """
+    workers = workers or int(setting('COLLECT_WORKERS', DEFAULT_WORKERS))
+    batch_size = batch_size or int(setting('WRITE_BATCH_SIZE', DEFAULT_BATCH_SIZE))
+    queue_size = queue_size or int(setting('WRITE_QUEUE_SIZE', workers * 4))
+    flush_secs = flush_secs or float(setting('WRITE_FLUSH_SECS', DEFAULT_FLUSH_SECS))
+
+    get_engine()  # 스레드 시작 전에 엔진 생성 (lru_cache 경쟁 방지)
+    out: "queue.Queue" = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    errors: List[BaseException] = []
+    it = iter(units)
+    it_lock = threading.Lock()
+
+    def next_unit():
+        with it_lock:
+            if stop.is_set():
+                return _DONE
+            return next(it, _DONE)
+
+    def worker():
+        while True:
+            unit = next_unit()
+            if unit is _DONE:
+                break
+            try:
+                for res in fetch_fn(unit):
+                    out.put(res)  # 큐가 가득 차면 writer 가 따라올 때까지 대기
+            except BaseException as e:
+                errors.append(e)
+                stop.set()
+        out.put(_DONE)
+
+    threads = [threading.Thread(target=worker, name=f"fetch-{i}", daemon=True) for i in range(workers)]
+    for t in threads:
+        t.start()
+
+    stats = PipelineStats()
+    pending: List[FetchResult] = []
+
+    def flush():
+        if not pending:
+            return
+        with get_engine().begin() as conn:
+            stats.touched |= write_results(conn, pending)
+        stats.results += len(pending)
+        stats.unchanged += sum(1 for r in pending if r.unchanged)
+        stats.batches += 1
+        logger.info(f"    ✓ 배치 저장 {len(pending)}건 (누적 {stats.results}건, {stats.batches}번째 트랜잭션)")
+        pending.clear()
+
+    finished = 0
+    last_flush = time.monotonic()
+    try:
+        while finished < workers:
+            try:
+                res = out.get(timeout=flush_secs)
+            except queue.Empty:
+                res = None
+            if res is _DONE:
+                finished += 1
+            elif res is not None:
+                pending.append(res)
+            if len(pending) >= batch_size or (pending and time.monotonic() - last_flush >= flush_secs):
+                flush()
+                last_flush = time.monotonic()
+        flush()
+    except BaseException as e:
+        # writer 실패: 워커를 멈추고, 막혀 있는 put 이 끝나도록 큐를 비운 뒤 중단 (이전 배치는 커밋됨)
+        stop.set()
+        while finished < workers:
+            if out.get() is _DONE:
+                finished += 1
+        if not isinstance(e, Exception):
+            raise
+        errors.insert(0, e)
+    finally:
+        for t in threads:
+            t.join()
+
+    failures = [e for e in errors if not isinstance(e, QuotaExceeded)]
+    if failures:
+        logger.error(f"▷ 수집 중단: 저장 완료 {stats.results}건, 오류 {len(failures)}건 - {failures[0]!r}")
+        stats.error = failures[0]
+    elif errors:
+        logger.info(f"▷ 일일 호출 한도 도달 - 수집 종료 (저장 완료 {stats.results}건, 남은 작업은 다음 실행)")
+        stats.quota_exhausted = True
+    return stats
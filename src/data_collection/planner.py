@@ -0,0 +1,298 @@
+# src/data_collection/planner.py
+import os
+import logging
+from datetime import date
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+from src.utils.db import fetch_dataframe
+from src.data_collection.dart_api import (
+    MULTI_BATCH_SIZE,
+    FS_PRIORITY,
+    REPORT_CODE,
+    get_report_codes,
+    get_remaining_calls
+)
+from src.utils.config import setting, setting_list
+
+logger = logging.getLogger(__name__)
+
+# 관심 종목은 WATCHLIST(콤마 구분) 환경변수 - 최우선 수집
+# 시가총액 CSV (stock_code, market_cap) 기본 경로 - 없으면 시가총액 우선순위 미적용
+DEFAULT_MARKET_CAP_FILE = 'market_caps.csv'
+
+
+@dataclass
+class PlanItem:
+    """
+    수집 작업 1건 = (종목, 사업연도, 보고서 코드)
+    """
+    ticker: str
+    corp_code: str
+    year: int
+    reprt_code: str
+    watch: bool = False
+    market_cap: float = 0.0
+    rank: int = 0  # 보고서 우선순위 (REPORT_CODES 내 순서)
+    cost: int = 0  # allocate 가 배정한 예상 호출 수 (describe 가 같은 값으로 집계)
+
+    def sort_key(self) -> Tuple:
+        # 관심종목 → 최신 연도 → 보고서 우선순위(REPORT_CODES 순) → 시가총액 큰 순
+        return (not self.watch, -self.year, self.rank, -self.market_cap, self.ticker)
+
+
+@dataclass
+class Plan:
+    """
+    남은 호출 예산(budget) 안에서 실행할 작업(items)과 다음날로 미룬 작업(deferred)
+    """
+    mode: str
+    budget: int
+    calls: int = 0
+    items: List[PlanItem] = field(default_factory=list)
+    deferred: List[PlanItem] = field(default_factory=list)
+    derived: List[PlanItem] = field(default_factory=list)
+    done: int = 0
+
+
+def load_market_caps(file_path: str = None) -> Dict[str, float]:
+    """
+    시가총액 CSV(stock_code, market_cap)를 {stock_code: market_cap} 으로 로드합니다.
+    file_path 미지정 시 MARKET_CAP_FILE 환경변수 경로를 사용합니다.
+    """
+    if file_path is None:
+        file_path = setting('MARKET_CAP_FILE', DEFAULT_MARKET_CAP_FILE)
+    if not file_path or not os.path.exists(file_path):
+        return {}
+    import pandas as pd
+    df = pd.read_csv(file_path, dtype={"stock_code": str})
+    df["stock_code"] = df["stock_code"].str.zfill(6)
+    df["market_cap"] = pd.to_numeric(df["market_cap"], errors="coerce").fillna(0)
+    return df.set_index("stock_code")["market_cap"].to_dict()
+
+
+def report_years(years: List[int], reprt_code: str, current_year: int) -> List[int]:
+    """
+    보고서별 수집 연도. 분기/반기 보고서는 올해 것도 이미 공시되므로 올해를 포함합니다.
+    """
+    if reprt_code != REPORT_CODE and current_year not in years:
+        return [current_year] + list(years)
+    return list(years)
+
+
+# 보고서별 회계기간 종료일 (월, 일)
+PERIOD_END = {'11011': (12, 31), '11014': (9, 30), '11012': (6, 30), '11013': (3, 31)}
+
+
+def listed_for_report(year: int, reprt_code: str, listed_date: Optional[date], delisted_date: Optional[date]) -> bool:
+    """
+    (year, reprt_code) 보고서가 상장 기간에 해당하는지 여부.
+      - 상장 연도 이전 보고서는 없음 (상장일 미상이면 제한 없음)
+      - 회계기간 종료일 이전에 상장폐지됐으면 해당 보고서는 공시되지 않음
+    """
+    if listed_date is not None and year < listed_date.year:
+        return False
+    if delisted_date is not None:
+        month, day = PERIOD_END.get(reprt_code, (12, 31))
+        if delisted_date <= date(year, month, day):
+            return False
+    return True
+
+
+def load_last_data_years(tickers) -> Dict[str, int]:
+    """
+    종목별 summary_financials 에 저장된 가장 최근 사업연도 {ticker: year}
+    """
+    tickers = sorted(set(tickers))
+    if not tickers:
+        return {}
+    df = fetch_dataframe("""
+        SELECT ticker, MAX(year) AS year
+          FROM summary_financials
+         WHERE ticker = ANY(:t)
+         GROUP BY ticker
+    """, {"t": tickers})
+    return {str(r.ticker).zfill(6): int(r.year) for r in df.itertuples()}
+
+
+def bound_unknown_delistings(
+    periods: Dict[str, Tuple[Optional[date], Optional[date]]],
+    unknown: Set[str]
+) -> Dict[str, Tuple[Optional[date], Optional[date]]]:
+    """
+    상장폐지일 미상(unknown) 종목은 이미 데이터가 있는 마지막 연도까지만 계획하도록
+    상장폐지일을 그다음 해 1월 1일로 둡니다. 데이터가 전혀 없으면 계획에서 제외합니다.
+    (오래전 상장폐지된 회사에 호출 예산이 쓰이지 않도록)
+    """
+    if not unknown:
+        return periods
+    last = load_last_data_years(unknown)
+    bounded = dict(periods)
+    for tkr in unknown:
+        listed = periods.get(tkr, (None, None))[0]
+        bounded[tkr] = (listed, date(last[tkr] + 1, 1, 1) if tkr in last else date.min)
+    return bounded
+
+
+def load_done_keys(mode: str, include_derived: bool = True) -> Set[Tuple[str, int, str]]:
+    """
+    이미 수집된 작업 키 조회
+      - headline: summary_financials 의 (ticker, year, report_code)
+      - full    : dart_cache 에 CFS 로 저장된 (stock_code, year, report_code)
+                  + 전기/전전기 금액에서 파생된 summary_financials 키
+    include_derived=False 면 파생 행은 수집된 것으로 보지 않습니다. (재작성 전 원본 재조회)
+    """
+    derived_cond = "" if include_derived else "WHERE derived_from IS NULL"
+    if mode == "full":
+        derived_sql = """
+            UNION
+            SELECT DISTINCT ticker, year, report_code
+              FROM summary_financials
+             WHERE derived_from IS NOT NULL
+        """ if include_derived else ""
+        df = fetch_dataframe(f"""
+            SELECT stock_code AS ticker, year, report_code
+              FROM dart_cache
+             WHERE fs_div = 'CFS'
+            {derived_sql}
+        """)
+    else:
+        df = fetch_dataframe(f"""
+            SELECT DISTINCT ticker, year, report_code
+              FROM summary_financials
+            {derived_cond}
+        """)
+    return {(str(r.ticker).zfill(6), int(r.year), str(r.report_code)) for r in df.itertuples()}
+
+
+def load_derived_keys() -> Set[Tuple[str, int, str]]:
+    """
+    전기/전전기 금액에서 파생된 summary_financials 행이 있는 (ticker, year, report_code)
+    """
+    df = fetch_dataframe("""
+        SELECT DISTINCT ticker, year, report_code
+          FROM summary_financials
+         WHERE derived_from IS NOT NULL
+    """)
+    return {(str(r.ticker).zfill(6), int(r.year), str(r.report_code)) for r in df.itertuples()}
+
+
+def build_tasks(
+    mapping: Dict[str, str],
+    years: List[int],
+    current_year: int,
+    reprt_codes: List[str] = None,
+    done: Set[Tuple[str, int, str]] = None,
+    periods: Dict[str, Tuple[Optional[date], Optional[date]]] = None
+) -> List[PlanItem]:
+    """
+    (종목 × 보고서 × 연도) 작업 목록을 만들고, 이미 수집된 작업은 제외한 뒤 우선순위 순으로 정렬합니다.
+    periods({ticker: (상장일, 상장폐지일)})가 있으면 상장 기간 밖의 연도·보고서는 만들지 않습니다.
+    """
+    reprt_codes = reprt_codes or get_report_codes()
+    done = done or set()
+    periods = periods or {}
+    watch = set(setting_list('WATCHLIST'))
+    caps = load_market_caps()
+
+    tasks = []
+    for rank, rpt in enumerate(reprt_codes):
+        for yr in report_years(years, rpt, current_year):
+            for tkr, corp in mapping.items():
+                if (tkr, yr, rpt) in done:
+                    continue
+                if tkr in periods and not listed_for_report(yr, rpt, *periods[tkr]):
+                    continue
+                tasks.append(PlanItem(
+                    ticker=tkr, corp_code=corp, year=yr, reprt_code=rpt,
+                    watch=tkr in watch, market_cap=caps.get(tkr, 0.0), rank=rank
+                ))
+    tasks.sort(key=PlanItem.sort_key)
+    return tasks
+
+
+def allocate(
+    tasks: List[PlanItem],
+    mode: str,
+    budget: int,
+    derive: bool = True,
+    derived: Set[Tuple[str, int, str]] = None
+) -> Plan:
+    """
+    우선순위 순으로 작업을 훑으며 예산 안에 들어가는 작업만 채택하고 작업별 예상 호출 수(cost)를 기록합니다.
+      - headline: (연도, 보고서) 그룹당 MULTI_BATCH_SIZE 개마다 호출 1회
+      - full    : 작업당 최대 len(FS_PRIORITY)회 (CFS 없으면 OFS 재호출) - 실행 중 한도 초과가 없도록 최대치로 계산
+                  (CFS 캐시는 기수집(done)이라 작업에 없음, OFS 캐시는 CFS 공시 여부를 다시 조회하므로 전체 비용)
+    derive=True 면 전기/전전기 금액에서 파생된 행이 실제로 저장된(derived) 작업은 호출하지 않습니다.
+    (원본이 계획만 됐거나 파생 도입 전 캐시만 있는 연도는 직접 계획)
+    """
+    plan = Plan(mode=mode, budget=budget)
+    group_counts: Dict[Tuple[int, str], int] = {}
+    derived = derived or set()
+    for item in tasks:
+        if derive and (item.ticker, item.year, item.reprt_code) in derived:
+            plan.derived.append(item)
+            continue
+        if mode == "full":
+            cost = len(FS_PRIORITY)
+        else:
+            key = (item.year, item.reprt_code)
+            cost = 1 if group_counts.get(key, 0) % MULTI_BATCH_SIZE == 0 else 0
+        if plan.calls + cost > budget:
+            plan.deferred.append(item)
+            continue
+        if mode != "full":
+            group_counts[key] = group_counts.get(key, 0) + 1
+        item.cost = cost
+        plan.calls += cost
+        plan.items.append(item)
+    return plan
+
+
+def make_plan(
+    mapping: Dict[str, str],
+    years: List[int],
+    current_year: int,
+    mode: str,
+    budget: Optional[int] = None,
+    derive: bool = True,
+    periods: Dict[str, Tuple[Optional[date], Optional[date]]] = None,
+    unknown_delisted: Set[str] = None
+) -> Plan:
+    """
+    남은 일일 호출 수(또는 지정 budget) 기준으로 수집 계획을 세웁니다. DART API 는 호출하지 않습니다.
+    derive=False 면 파생 데이터가 있어도 해당 연도 보고서를 직접 조회합니다.
+    unknown_delisted: 상장폐지일 미상 종목 (bound_unknown_delistings 참고)
+    """
+    if budget is None:
+        budget = get_remaining_calls()
+    periods = bound_unknown_delistings(periods or {}, set(unknown_delisted or ()) & set(mapping))
+    done = load_done_keys(mode, include_derived=False)
+    tasks = build_tasks(mapping, years, current_year, done=done, periods=periods)
+    derived = load_derived_keys() if derive else set()
+    plan = allocate(tasks, mode, budget, derive=derive, derived=derived)
+    plan.done = len(done)
+    return plan
+
+
+def describe(plan: Plan) -> str:
+    """
+    dry-run 출력용 계획 요약 (보고서·연도별 작업 수와 예상 호출 수)
+    """
+    lines = [
+        f"수집 모드: {plan.mode} | 남은 호출 예산: {plan.budget:,} | 예상 호출 수: {plan.calls:,}",
+        f"실행 작업: {len(plan.items):,}건 | 예산 부족으로 연기: {len(plan.deferred):,}건 | 기수집: {plan.done:,}건",
+        f"전기/전전기 금액으로 파생(호출 생략): {len(plan.derived):,}건",
+    ]
+    if plan.mode == "full":
+        lines.append(f"(full 모드는 CFS 없을 때 OFS 재조회를 포함해 작업당 최대 {len(FS_PRIORITY)}회로 계산)")
+
+    # allocate 가 배정한 작업별 cost 를 그대로 합산 (예상 호출 수 합계와 일치)
+    counts: Dict[Tuple[str, int], List[int]] = {}
+    for item in plan.items:
+        n_calls = counts.setdefault((item.reprt_code, item.year), [0, 0])
+        n_calls[0] += 1
+        n_calls[1] += item.cost
+    for (rpt, yr), (n, calls) in sorted(counts.items(), key=lambda kv: (kv[0][0], -kv[0][1])):
+        lines.append(f"  - {rpt} {yr}: {n:,}건 (호출 최대 {calls:,}회)")
+    return "\n".join(lines)
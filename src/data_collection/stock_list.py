@@ -1,11 +1,68 @@
-# src/data_collection/stock_list.py
-import requests
-import pandas as pd
-
-def fetch_krx_tickers() -> pd.DataFrame:
-    url = 'https://kind.krx.co.kr/corpgeneral/corpList.do?method=download&searchType=13'
-    resp = requests.get(url, timeout=10)
-    resp.raise_for_status()
-    df = pd.read_html(resp.text, header=0)[0]
-    df['종목코드'] = df['종목코드'].astype(str).str.zfill(6)
-    return df[['회사명','종목코드']].rename(columns={'회사명':'corp_name','종목코드':'stock_code'})
+# src/data_collection/stock_list.py
+import os
+from typing import TYPE_CHECKING, Optional
+
+# pandas 는 목록을 읽는 시점에 import (universe 등 import 시간 단축)
+if TYPE_CHECKING:
+    import pandas as pd
+
+KRX_LISTING_URL = 'https://kind.krx.co.kr/corpgeneral/corpList.do?method=download&searchType=13'
+# 상장 종목 표준 컬럼 (delisted_date 는 로컬 파일에만 있을 수 있음)
+LISTING_COLUMNS = ['corp_name', 'stock_code', 'listed_date', 'delisted_date']
+
+
+def _normalize(df: 'pd.DataFrame') -> 'pd.DataFrame':
+    """
+    KRX 다운로드(한글 컬럼) 또는 로컬 CSV(영문 컬럼)를 LISTING_COLUMNS 형태로 맞춥니다.
+    """
+    import pandas as pd
+
+    df = df.rename(columns={'회사명': 'corp_name', '종목코드': 'stock_code', '상장일': 'listed_date'})
+    for col in LISTING_COLUMNS:
+        if col not in df.columns:
+            df[col] = None
+    df['stock_code'] = df['stock_code'].astype(str).str.extract(r'(\d+)')[0].str.zfill(6)
+    df['listed_date'] = pd.to_datetime(df['listed_date'], errors='coerce').dt.date
+    df['delisted_date'] = pd.to_datetime(df['delisted_date'], errors='coerce').dt.date
+    df = df.dropna(subset=['stock_code']).drop_duplicates('stock_code', keep='last')
+    return df[LISTING_COLUMNS].reset_index(drop=True)
+
+
+def fetch_krx_tickers() -> 'pd.DataFrame':
+    """
+    KRX(KIND) 상장법인 목록을 내려받아 (corp_name, stock_code, listed_date, delisted_date) 로 반환합니다.
+    """
+    import requests
+    import pandas as pd
+
+    resp = requests.get(KRX_LISTING_URL, timeout=10)
+    resp.raise_for_status()
+    df = pd.read_html(resp.text, header=0)[0]
+    return _normalize(df)
+
+
+def load_listing(source: Optional[str] = None) -> 'pd.DataFrame':
+    """
+    상장 종목 목록을 읽습니다.
+      - 'krx'             : KRX(KIND)에서 내려받기
+      - *.csv             : 로컬 CSV (stock_code, corp_name, listed_date[, delisted_date])
+      - 그 외 파일(.xls 등): KRX 에서 저장한 다운로드 파일(HTML 표)
+    """
+    import pandas as pd
+
+    if not source or source.lower() == 'krx':
+        return fetch_krx_tickers()
+    if not os.path.exists(source):
+        raise FileNotFoundError(f"상장 종목 파일이 없습니다: {source}")
+    if source.lower().endswith('.csv'):
+        df = pd.read_csv(source, dtype={'stock_code': str, '종목코드': str})
+    else:
+        with open(source, 'rb') as f:
+            raw = f.read()
+        # KRX 다운로드 파일은 EUC-KR(cp949) 인코딩
+        try:
+            html = raw.decode('utf-8')
+        except UnicodeDecodeError:
+            html = raw.decode('cp949', errors='replace')
+        df = pd.read_html(html, header=0, converters={'종목코드': str})[0]
+    return _normalize(df)
@@ -0,0 +1,193 @@
+# src/data_collection/universe.py
+#
+# 수집 대상(상장 종목) 동기화
+#   python -m src.data_collection.universe                      # UNIVERSE_SOURCE(기본 krx) 기준 동기화
+#   python -m src.data_collection.universe --source listing.csv --dry-run
+#
+# KRX 상장 목록과 corp_codes 를 비교해 is_listed / listed_date / delisted_date 를 갱신합니다.
+#   - 목록에 있음  → is_listed = TRUE, listed_date 갱신 (재상장이면 delisted_date 해제)
+#   - 목록에서 빠짐 → is_listed = FALSE, delisted_date = 동기화 날짜
+#                     (첫 동기화에서 이미 빠져 있던 회사는 상장폐지일 미상 = NULL)
+# 수집 계획은 상장 기간에 해당하는 연도·보고서만 만듭니다. (planner.listed_for_report)
+#
+# 업종코드(induty_code)는 DART 기업개황(company.json)으로 회사당 한 번 조회해 corp_codes 에 캐시합니다.
+import sys
+import logging
+import argparse
+from datetime import date, datetime
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional
+
+from sqlalchemy import text
+
+from src.utils.config import setting
+from src.utils.db import get_engine, fetch_dataframe
+from src.data_collection.stock_list import load_listing
+from src.data_collection.dart_api import fetch_company_info, get_remaining_calls
+
+# pandas 는 목록 비교 시점에 import (main / 스케줄러 import 시간 단축)
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# 목록이 이 비율보다 작게 줄었으면 다운로드 오류로 보고 상장폐지 처리를 하지 않음
+MIN_LISTING_RATIO = 0.8
+# 한 번 실행에서 업종코드 조회에 쓸 최대 호출 수 기본값 (INDUSTRY_MAX_CALLS 환경변수)
+DEFAULT_INDUSTRY_MAX_CALLS = 500
+
+
+def _value(v):
+    import pandas as pd
+    return None if v is None or pd.isna(v) else v
+
+
+def _delisted(v) -> bool:
+    import pandas as pd
+    # is_listed NULL = 아직 동기화 전 → 상장으로 간주
+    return v is not None and not pd.isna(v) and not bool(v)
+
+
+def diff_listing(current: 'pd.DataFrame', listing: 'pd.DataFrame', today: date) -> List[Dict]:
+    """
+    corp_codes 현재 상태(corp_code, stock_code, is_listed, listed_date, delisted_date)와
+    상장 목록(stock_code, listed_date, delisted_date)을 비교해 바뀐 행의 UPDATE 파라미터를 만듭니다.
+    상장으로 동기화돼 있던 회사가 목록에서 빠지면 상장폐지일 = today,
+    한 번도 동기화되지 않은(is_listed NULL) 회사는 언제 폐지됐는지 알 수 없으므로 NULL 로 둡니다.
+    (상장폐지일 미상 회사는 planner 가 이미 저장된 데이터 연도까지만 계획)
+    """
+    listed = listing.set_index('stock_code')
+    changes = []
+    for r in current.itertuples(index=False):
+        if r.stock_code in listed.index:
+            row = listed.loc[r.stock_code]
+            new = {
+                'is_listed': _value(row['delisted_date']) is None,
+                'listed_date': _value(row['listed_date']) or _value(r.listed_date),
+                'delisted_date': _value(row['delisted_date']),
+            }
+        elif _delisted(r.is_listed):
+            continue  # 이미 상장폐지 처리됨
+        else:
+            new = {
+                'is_listed': False,
+                'listed_date': _value(r.listed_date),
+                'delisted_date': today if _value(r.is_listed) is not None else None,
+            }
+        old = {
+            'is_listed': None if _value(r.is_listed) is None else bool(r.is_listed),
+            'listed_date': _value(r.listed_date),
+            'delisted_date': _value(r.delisted_date),
+        }
+        if new != old:
+            changes.append({'c': r.corp_code, 'l': new['is_listed'],
+                            'ld': new['listed_date'], 'dd': new['delisted_date']})
+    return changes
+
+
+def sync_universe(source: Optional[str] = None, today: Optional[date] = None, dry_run: bool = False) -> Dict[str, int]:
+    """
+    상장 목록(source: 'krx' 또는 파일 경로, 기본 UNIVERSE_SOURCE)으로 corp_codes 상장 상태를 동기화하고
+    {listed, delisted, relisted, unknown} 건수를 반환합니다.
+    """
+    source = source or setting('UNIVERSE_SOURCE', 'krx')
+    today = today or datetime.now().date()
+    listing = load_listing(source)
+    if listing.empty:
+        raise RuntimeError(f"상장 종목 목록이 비어 있습니다: {source}")
+
+    current = fetch_dataframe("""
+        SELECT corp_code, stock_code, is_listed, listed_date, delisted_date
+          FROM corp_codes
+         WHERE stock_code ~ '^[0-9]+$' AND stock_code <> '000000'
+    """)
+    current['stock_code'] = current['stock_code'].str.zfill(6)
+
+    # 이미 상장으로 동기화된 회사 수 기준 (첫 동기화 전에는 NULL 이 전체라 비교하지 않음)
+    active = sum(1 for v in current['is_listed'] if _value(v) is not None and bool(v))
+    if active and len(listing) < active * MIN_LISTING_RATIO:
+        raise RuntimeError(
+            f"상장 종목 목록({len(listing)}건)이 현재 상장 종목({active}건)보다 너무 작습니다 - 동기화 중단"
+        )
+
+    changes = diff_listing(current, listing, today)
+    was_delisted = {r.corp_code: _delisted(r.is_listed) for r in current.itertuples(index=False)}
+    stats = {
+        'listed': sum(1 for c in changes if c['l'] and not was_delisted.get(c['c'])),
+        'delisted': sum(1 for c in changes if not c['l'] and not was_delisted.get(c['c'])),
+        'relisted': sum(1 for c in changes if c['l'] and was_delisted.get(c['c'])),
+        # DART corp_codes 에 아직 없는 신규 상장 종목 (corp_code 는 DART 법인코드 파일로만 얻을 수 있음)
+        'unknown': int((~listing['stock_code'].isin(current['stock_code'])).sum()),
+    }
+    logger.info(
+        f"▷ 상장 종목 동기화 [{source}]: 목록 {len(listing):,}건 | 변경 {len(changes):,}건 "
+        f"(신규 {stats['listed']:,}, 상장폐지 {stats['delisted']:,}, 재상장 {stats['relisted']:,}) | "
+        f"corp_codes 미등록 {stats['unknown']:,}건"
+    )
+    if changes and not dry_run:
+        with get_engine().begin() as conn:
+            conn.execute(text("""
+                UPDATE corp_codes
+                   SET is_listed     = :l,
+                       listed_date   = :ld,
+                       delisted_date = :dd
+                 WHERE corp_code = :c
+            """), changes)
+    return stats
+
+
+def update_industry_codes(tickers: Iterable[str], max_calls: Optional[int] = None) -> List[str]:
+    """
+    업종코드가 아직 조회되지 않은 회사의 기업개황(company.json)을 조회해 corp_codes 에 저장합니다.
+    tickers 의 회사를 먼저, 그다음 요약 데이터가 있는 다른 회사를 max_calls
+    (기본 INDUSTRY_MAX_CALLS, 남은 일일 호출 수 이내)까지 채웁니다. 업종코드가 새로 저장된 종목코드 목록을 반환합니다.
+    induty_checked_at 은 정상 응답(000) 또는 데이터 없음(013)일 때만 기록하며, 그 밖의 상태에서는 조회를 멈춥니다.
+    """
+    max_calls = max_calls or int(setting('INDUSTRY_MAX_CALLS', DEFAULT_INDUSTRY_MAX_CALLS))
+    max_calls = min(max_calls, get_remaining_calls())
+    if max_calls <= 0:
+        return []
+    todo = fetch_dataframe("""
+        SELECT c.corp_code, c.stock_code
+          FROM corp_codes c
+         WHERE c.induty_checked_at IS NULL
+           AND (c.stock_code = ANY(:tickers)
+                OR EXISTS (SELECT 1 FROM summary_financials s WHERE s.ticker = c.stock_code))
+         ORDER BY (c.stock_code = ANY(:tickers)) DESC, c.stock_code
+         LIMIT :n
+    """, {"tickers": sorted(set(tickers)), "n": max_calls})
+
+    rows, updated = [], []
+    try:
+        for r in todo.itertuples(index=False):
+            info = fetch_company_info(r.corp_code)
+            code = (info.get('induty_code') or '').strip() or None
+            rows.append({"c": r.corp_code, "i": code})
+            if code:
+                updated.append(r.stock_code)
+    except Exception as e:
+        # 일일 호출 한도·요청 제한(020)·점검(800)·네트워크 오류 등 → 확정된 회사만 저장하고 나머지는 다음 실행에서 다시 조회
+        logger.warning(f"▷ 업종코드 조회 중단: {e}")
+    if rows:
+        with get_engine().begin() as conn:
+            conn.execute(text("""
+                UPDATE corp_codes
+                   SET induty_code = :i,
+                       induty_checked_at = NOW()
+                 WHERE corp_code = :c
+            """), rows)
+    logger.info(f"▷ 업종코드 조회 {len(rows)}건 (저장 {len(updated)}건)")
+    return updated
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="KRX 상장 목록으로 수집 대상(corp_codes) 동기화")
+    parser.add_argument("--source", default=None, help="'krx' 또는 상장 목록 파일(csv / KRX 다운로드 파일)")
+    parser.add_argument("--dry-run", action="store_true", help="변경 건수만 출력 (DB 변경 없음)")
+    args = parser.parse_args(argv)
+    sync_universe(args.source, dry_run=args.dry_run)
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format="%(asctime)s [%(levelname)s] %(message)s", level=logging.INFO)
+    sys.exit(main())
@@ -0,0 +1,175 @@
+# src/scripts/backfill_summary.py
+#
+# dart_cache 원본으로 summary_financials 재계산 (DART 호출 없음)
+#   python -m src.scripts.backfill_summary                          # 전체
+#   python -m src.scripts.backfill_summary --since 2025-01-01       # 해당 시각 이후 바뀐 캐시만
+#   python -m src.scripts.backfill_summary --tickers 005930,000660 --dry-run
+#
+# compute_ratios 정의가 바뀌었을 때 사용합니다.
+#   - dart_cache 를 서버 측 커서로 chunk 단위 스트리밍 (전체를 메모리에 올리지 않음)
+#   - 압축 해제·파싱·비율 계산은 프로세스 풀에서 병렬 처리 (사업보고서는 전기/전전기 파생 연도 포함)
+#   - 결과는 chunk 마다 배열 파라미터 UPDATE/INSERT 두 문장으로 저장
+#   - 진행률·처리량(행/초) 로그, 끝나면 바뀐 종목의 대시보드 payload·업종 집계 갱신
+import os
+import sys
+import time
+import logging
+import argparse
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from src.utils.db import get_engine, fetch_dataframe, iter_dataframes
+from src.utils.amounts import parse_statement
+from src.utils.storage import bulk_upsert_summaries, decode_cache_payload
+from src.data_collection.derive import derive_prior_years
+from src.analysis.ratios import summarize_financials
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 500
+
+
+def compute_chunk(rows: List[Tuple]) -> Tuple[List[Dict], int]:
+    """
+    (프로세스 풀 작업) dart_cache 행 묶음 → summary_financials 행 목록, 원본 없는 행 수
+    rows: (corp_name, stock_code, year, report_code, fs_div, recs, recs_z)
+    """
+    out, skipped = [], 0
+    for corp_name, ticker, year, rpt, fs_div, recs, recs_z in rows:
+        recs = decode_cache_payload(recs, recs_z)
+        if not recs:
+            skipped += 1  # DART_CACHE_PAYLOAD=none 으로 원본이 저장되지 않은 행
+            continue
+        stmt = parse_statement(recs)
+        statements = [(year, stmt, None)] + [
+            (dyr, dstmt, year) for dyr, dstmt in derive_prior_years(stmt, year, rpt).items()
+        ]
+        for yr, st, derived_from in statements:
+            out.append({
+                "corp_name": corp_name, "ticker": ticker, "year": int(yr),
+                "report_code": rpt, "fs_div": fs_div, "derived_from": derived_from,
+                **summarize_financials(st, ticker),
+            })
+    return out, skipped
+
+
+def stream_cache_rows(since: Optional[datetime], tickers: Optional[List[str]], chunk_size: int):
+    """
+    조건에 맞는 dart_cache 행을 서버 측 커서로 chunk_size 개씩 yield 합니다. (db.iter_dataframes)
+    """
+    conds, params = ["c.stock_code IS NOT NULL"], {}
+    if since:
+        conds.append("c.last_updated >= :since")
+        params["since"] = since
+    if tickers:
+        conds.append("c.stock_code = ANY(:tickers)")
+        params["tickers"] = tickers
+    for df in iter_dataframes(f"""
+        SELECT COALESCE(cc.corp_name, '') AS corp_name, c.stock_code, c.year, c.report_code,
+               c.fs_div, c.recs, c.recs_z
+          FROM dart_cache c
+          LEFT JOIN corp_codes cc ON cc.corp_code = c.corp_code
+         WHERE {" AND ".join(conds)}
+         ORDER BY c.stock_code, c.year, c.report_code
+    """, params, chunk_size=chunk_size):
+        # bytea 는 memoryview 로 오므로 프로세스 풀로 넘기기 전에 bytes 로 (memoryview 는 pickle 불가)
+        df['recs_z'] = [None if v is None else bytes(v) for v in df['recs_z']]
+        yield list(df.itertuples(index=False, name=None))
+
+
+def count_cache_rows(since: Optional[datetime], tickers: Optional[List[str]]) -> int:
+    conds, params = ["stock_code IS NOT NULL"], {}
+    if since:
+        conds.append("last_updated >= :since")
+        params["since"] = since
+    if tickers:
+        conds.append("stock_code = ANY(:tickers)")
+        params["tickers"] = tickers
+    return int(fetch_dataframe(
+        f"SELECT COUNT(*) AS n FROM dart_cache WHERE {' AND '.join(conds)}", params
+    )["n"].iloc[0])
+
+
+def backfill(
+    since: Optional[datetime] = None,
+    tickers: Optional[List[str]] = None,
+    dry_run: bool = False,
+    workers: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Dict[str, int]:
+    """
+    dart_cache 를 스트리밍하며 프로세스 풀에서 지표를 계산하고 summary_financials 에 일괄 저장합니다.
+    읽기 chunk 는 최대 workers*2 개만 동시에 처리 중이므로 메모리 사용량이 전체 행 수와 무관합니다.
+    """
+    workers = workers or os.cpu_count() or 1
+    total = count_cache_rows(since, tickers)
+    logger.info(f"▷ 재계산 대상 dart_cache {total:,}행 (워커 {workers}개, chunk {chunk_size}행){' [dry-run]' if dry_run else ''}")
+
+    stats = {"rows": 0, "summaries": 0, "written": 0, "skipped": 0}
+    touched = set()
+    started = time.monotonic()
+
+    def collect(done):
+        for fut in done:
+            out, skipped = fut.result()
+            stats["skipped"] += skipped
+            stats["summaries"] += len(out)
+            if out and not dry_run:
+                with get_engine().begin() as conn:
+                    stats["written"] += bulk_upsert_summaries(conn, out)
+                touched.update(r["ticker"] for r in out)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = {}
+        for rows in stream_cache_rows(since, tickers, chunk_size):
+            pending[pool.submit(compute_chunk, rows)] = len(rows)
+            if len(pending) >= workers * 2:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    stats["rows"] += pending.pop(fut)
+                collect(done)
+                elapsed = time.monotonic() - started
+                logger.info(
+                    f"    {stats['rows']:,}/{total:,}행 ({stats['rows'] / max(total, 1):.0%}) | "
+                    f"{stats['rows'] / elapsed:,.0f}행/s | 지표 {stats['summaries']:,}건"
+                )
+        done, _ = wait(pending)
+        for fut in done:
+            stats["rows"] += pending.pop(fut)
+        collect(done)
+
+    elapsed = time.monotonic() - started
+    logger.info(
+        f"▷ 재계산 완료: {stats['rows']:,}행 / {elapsed:.1f}s ({stats['rows'] / max(elapsed, 1e-9):,.0f}행/s) | "
+        f"지표 {stats['summaries']:,}건, 저장 {stats['written']:,}건, 원본 없음 {stats['skipped']:,}행"
+    )
+
+    if touched:
+        # 지표가 바뀐 종목의 대시보드 payload / 업종 집계 갱신
+        from src.utils.payloads import refresh_payloads
+        from src.analysis.sector_stats import refresh_sector_stats
+        refresh_payloads(touched)
+        refresh_sector_stats(touched)
+    stats["tickers"] = len(touched)
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="dart_cache 로 summary_financials 재계산 (DART 호출 없음)")
+    parser.add_argument("--since", type=datetime.fromisoformat, default=None,
+                        help="이 시각 이후 바뀐(last_updated) 캐시만 재계산 (예: 2025-01-01)")
+    parser.add_argument("--tickers", default="", help="재계산할 종목코드 (콤마 구분, 기본 전체)")
+    parser.add_argument("--dry-run", action="store_true", help="계산만 하고 저장하지 않음")
+    parser.add_argument("--workers", type=int, default=None, help="프로세스 수 (기본 CPU 코어 수)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="커서 chunk / 작업 단위 행 수")
+    args = parser.parse_args(argv)
+
+    tickers = [t.strip().zfill(6) for t in args.tickers.split(",") if t.strip()] or None
+    backfill(args.since, tickers, args.dry_run, args.workers, args.chunk_size)
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format="%(asctime)s [%(levelname)s] %(message)s", level=logging.INFO)
+    sys.exit(main())
@@ -0,0 +1,97 @@
+# src/scripts/check_import_time.py
+#
+# 모듈 import 시간 / import 부작용 점검
+#   python -m src.scripts.check_import_time                # 기본 모듈, 기본 예산
+#   python -m src.scripts.check_import_time --budget-ms 800 main app
+#
+# 각 모듈을 새 인터프리터에서 `python -X importtime` 으로 import 하여
+#   - 누적 import 시간이 예산(IMPORT_BUDGET_MS)을 넘는지
+#   - DATABASE_URL / DART_API_KEY 없이도 import 되는지 (import 시점 DB 연결·키 검사 없음)
+#   - 차트를 그리지 않는 모듈이 matplotlib 을 끌어오지 않는지
+#   - src.* 라이브러리 모듈이 import 시점에 pandas 를 로드하지 않는지 (진입점 main 은 예외)
+# 를 확인하고, 하나라도 어기면 exit code 1 로 종료합니다. (CI 에서 회귀 방지용)
+import os
+import sys
+import argparse
+import subprocess
+from typing import Dict, List, Tuple
+
+DEFAULT_MODULES = [
+    "src.utils.db",
+    "src.data_collection.dart_api",
+    "src.data_collection.planner",
+    "src.data_collection.pipeline",
+    "src.data_collection.universe",
+    "src.analysis.ratios",
+    "src.utils.payloads",
+    "src.api.server",
+    "src.scripts.backfill_summary",
+    "main",
+]
+# import 만으로 로드되면 안 되는 무거운 모듈
+FORBIDDEN_IMPORTS = ["matplotlib", "requests", "dotenv"]
+# 실행 진입점(main 등)이 아닌 라이브러리 모듈은 pandas 도 실제 조회/파싱 시점에 import
+LIBRARY_FORBIDDEN_IMPORTS = FORBIDDEN_IMPORTS + ["pandas"]
+LIBRARY_PREFIX = "src."
+DEFAULT_BUDGET_MS = int(os.getenv("IMPORT_BUDGET_MS", 1500))
+
+
+def measure(module: str) -> Tuple[int, float, List[str], str]:
+    """
+    새 프로세스에서 module 을 import 하고 (returncode, 누적 ms, 로드된 금지 모듈, stderr 꼬리) 를 반환합니다.
+    .env / DB 설정 없이 import 되어야 하므로 관련 환경변수는 지우고 실행합니다.
+    """
+    env = {k: v for k, v in os.environ.items() if k not in ("DATABASE_URL", "DART_API_KEY")}
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env
+    )
+    forbidden = LIBRARY_FORBIDDEN_IMPORTS if module.startswith(LIBRARY_PREFIX) else FORBIDDEN_IMPORTS
+    total_us, loaded = 0, set()
+    for line in proc.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = [p.strip() for p in line[len("import time:"):].split("|")]
+        if len(parts) != 3 or not parts[1].isdigit():
+            continue
+        name = parts[2].strip()
+        top = name.split(".")[0]
+        if top in forbidden:
+            loaded.add(top)
+        if name == module:
+            total_us = int(parts[1])
+    tail = "\n".join(l for l in proc.stderr.splitlines() if not l.startswith("import time:"))[-500:]
+    return proc.returncode, total_us / 1000.0, sorted(loaded), tail
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="모듈 import 시간/부작용 점검")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES, help="점검할 모듈 (기본: 수집기/DB 모듈)")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="모듈별 누적 import 시간 예산(ms)")
+    args = parser.parse_args(argv)
+
+    failed = False
+    results: Dict[str, float] = {}
+    for module in args.modules:
+        rc, ms, loaded, tail = measure(module)
+        results[module] = ms
+        if rc != 0:
+            print(f"✗ {module}: import 실패\n{tail}")
+            failed = True
+            continue
+        problems = []
+        if ms > args.budget_ms:
+            problems.append(f"예산 초과 ({ms:,.0f}ms > {args.budget_ms:,.0f}ms)")
+        if loaded:
+            problems.append(f"import 시점에 로드됨: {', '.join(loaded)}")
+        if problems:
+            print(f"✗ {module}: {ms:,.0f}ms - " + "; ".join(problems))
+            failed = True
+        else:
+            print(f"✓ {module}: {ms:,.0f}ms")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
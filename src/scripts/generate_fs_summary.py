@@ -2,13 +2,15 @@
 import os, glob
 import pandas as pd
 
+from src.utils.amounts import parse_statement
+
 # 1) data/raw/*.csv 파일 목록
 raw_files = glob.glob("data/raw/*.csv")
 
 rows = []
 for fp in raw_files:
     df = pd.read_csv(fp, dtype=str)
-    df['thstrm_amount'] = pd.to_numeric(df['thstrm_amount'], errors='coerce')
+    df['thstrm_amount'] = parse_statement(df).column('thstrm_amount')
     pivot = df.set_index('account_nm')['thstrm_amount'].sum()
 
     rows.append({
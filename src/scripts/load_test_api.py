@@ -0,0 +1,107 @@
+# src/scripts/load_test_api.py
+#
+# 로컬 API 부하 테스트 (표준 라이브러리만 사용)
+#   python -m src.api.server --port 8000 &
+#   python -m src.scripts.load_test_api --url http://127.0.0.1:8000 --tickers 005930,000660 -c 32 -n 5000
+#
+# 동시 클라이언트 c 개가 요청 n 건을 나눠 보내고 초당 요청 수, 지연시간(p50/p95/p99), 상태코드·캐시 적중 분포를 출력합니다.
+# --revalidate 를 주면 받은 ETag 로 If-None-Match 를 보내 304 재검증 경로를 측정합니다.
+import sys
+import time
+import random
+import argparse
+import threading
+import http.client
+from collections import Counter
+from typing import List
+from urllib.parse import urlsplit
+
+
+def build_paths(tickers: List[str], year: int) -> List[str]:
+    paths = [f"/screener?year={year}&limit=50", f"/screener?year={year}&roe_min=10&debt_ratio_max=100"]
+    for t in tickers:
+        paths += [
+            f"/companies/{t}/summary",
+            f"/companies/{t}/summary?year={year}&report_code=11011&fs_div=CFS",
+            f"/companies/{t}/raw?year={year}",
+            f"/companies/{t}/trend?metric=roe",
+        ]
+    return paths
+
+
+def run(url: str, paths: List[str], clients: int, total: int, revalidate: bool):
+    target = urlsplit(url)
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    cache: Counter = Counter()
+    lock = threading.Lock()
+    remaining = [total]
+
+    def client():
+        conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=30)
+        etags = {}
+        local_lat, local_status, local_cache = [], Counter(), Counter()
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    break
+                remaining[0] -= 1
+            path = random.choice(paths)
+            headers = {"If-None-Match": etags[path]} if revalidate and path in etags else {}
+            start = time.perf_counter()
+            try:
+                conn.request("GET", path, headers=headers)
+                resp = conn.getresponse()
+                resp.read()
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=30)
+                local_status["error"] += 1
+                continue
+            local_lat.append(time.perf_counter() - start)
+            local_status[resp.status] += 1
+            local_cache[resp.getheader("X-Cache", "-")] += 1
+            if resp.getheader("ETag"):
+                etags[path] = resp.getheader("ETag")
+        conn.close()
+        with lock:
+            latencies.extend(local_lat)
+            statuses.update(local_status)
+            cache.update(local_cache)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000 if latencies else 0.0
+
+    print(f"요청 {sum(statuses.values()):,}건 / {elapsed:.2f}s → {len(latencies) / elapsed:,.0f} req/s (동시 {clients})")
+    print(f"지연시간 p50 {pct(0.50):.1f}ms | p95 {pct(0.95):.1f}ms | p99 {pct(0.99):.1f}ms")
+    print(f"상태코드 {dict(statuses)} | 캐시 {dict(cache)}")
+    return statuses
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="API 부하 테스트")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--tickers", default="005930,000660,035420", help="요청할 종목코드(콤마 구분)")
+    parser.add_argument("--year", type=int, default=time.localtime().tm_year - 1)
+    parser.add_argument("-c", "--clients", type=int, default=16, help="동시 클라이언트 수")
+    parser.add_argument("-n", "--requests", type=int, default=2000, help="총 요청 수")
+    parser.add_argument("--revalidate", action="store_true", help="ETag 로 If-None-Match 재검증")
+    args = parser.parse_args(argv)
+
+    paths = build_paths([t.strip() for t in args.tickers.split(",") if t.strip()], args.year)
+    statuses = run(args.url, paths, args.clients, args.requests, args.revalidate)
+    return 1 if statuses.get("error") or statuses.get(500) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+# src/utils/amounts.py
+import logging
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, List, Sequence, Tuple, Union
+
+import numpy as np
+
+# pandas 는 실제 파싱 시점에 import (수집기/DB 모듈 import 시간 단축)
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# 당기 / 전기 / 전전기 금액 컬럼 (ParsedStatement.amounts 의 열 순서)
+AMOUNT_COLUMNS = ('thstrm_amount', 'frmtrm_amount', 'bfefrm_amount')
+# raw_financials 금액 컬럼(BIGINT) 범위
+INT64_MIN, INT64_MAX = -2 ** 63, 2 ** 63 - 1
+
+
+def parse_amounts(values: Sequence) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    DART 금액 값 목록을 한 번에 int64 배열과 결측 마스크로 변환합니다.
+      - '1,234' / ' 1234 ' / 1234 → 1234
+      - '(1,234)' / '-1,234'      → -1234
+      - '', '-', None, 숫자 아님   → 결측 (값 0, mask True)
+    float 을 거치지 않고 정수 문자열을 그대로 int 로 읽으므로 2^53 을 넘는 금액도 정확합니다.
+    소수부가 있는 값('1.5')이나 int64 범위를 넘는 값은 반올림하지 않고 결측으로 처리합니다. ('1234.0' 은 1234)
+    """
+    import pandas as pd
+    s = pd.Series(values, dtype=object)
+    s = s.where(s.notna(), '').astype(str).str.strip()
+    neg_paren = (s.str.startswith('(') & s.str.endswith(')')).to_numpy()
+    digits = s.str.replace(r'[,\s()]', '', regex=True)
+    valid = digits.str.fullmatch(r'-?\d+(?:\.0*)?').to_numpy(dtype=bool)
+
+    out = np.zeros(len(s), dtype=np.int64)
+    null = ~valid
+    for i in np.flatnonzero(valid):
+        n = int(digits.iat[i].split('.')[0])
+        if neg_paren[i]:
+            n = -n
+        if INT64_MIN <= n <= INT64_MAX:
+            out[i] = n
+        else:
+            null[i] = True
+    return out, null
+
+
+@dataclass
+class ParsedStatement:
+    """
+    수집 직후 한 번 파싱한 재무제표.
+    raw 저장, 비율 계산, 캐시 저장, 과거 연도 파생이 모두 이 구조를 공유합니다.
+      - amounts: (n, 3) int64, AMOUNT_COLUMNS 순서 (결측 자리는 0)
+      - null   : (n, 3) bool, True 면 결측
+    """
+    account_id: np.ndarray
+    account_nm: np.ndarray
+    amounts: np.ndarray
+    null: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.account_id)
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        금액 컬럼을 float 배열로 반환합니다. (결측은 NaN)
+        """
+        i = AMOUNT_COLUMNS.index(name)
+        return np.where(self.null[:, i], np.nan, self.amounts[:, i].astype(np.float64))
+
+    def to_frame(self) -> 'pd.DataFrame':
+        """
+        비율 계산용 DataFrame (account_id, account_nm, amount=당기금액 float)
+        """
+        import pandas as pd
+        return pd.DataFrame({
+            'account_id': self.account_id,
+            'account_nm': self.account_nm,
+            'amount':     self.column('thstrm_amount'),
+        })
+
+    def to_records(self) -> List[Dict]:
+        """
+        캐시 저장용 레코드 (금액은 int, 결측은 None) - 다시 읽을 때 문자열 파싱이 필요 없음
+        """
+        cols = [
+            [None if n else int(v) for v, n in zip(self.amounts[:, i], self.null[:, i])]
+            for i in range(len(AMOUNT_COLUMNS))
+        ]
+        return [{
+            'account_id': aid,
+            'account_nm': anm,
+            **{name: cols[i][j] for i, name in enumerate(AMOUNT_COLUMNS)},
+        } for j, (aid, anm) in enumerate(zip(self.account_id, self.account_nm))]
+
+    def take(self, rows: np.ndarray) -> 'ParsedStatement':
+        return ParsedStatement(
+            self.account_id[rows], self.account_nm[rows],
+            self.amounts[rows], self.null[rows]
+        )
+
+
+def parse_statement(recs: Union[List[Dict], 'pd.DataFrame']) -> ParsedStatement:
+    """
+    fetch 결과(recs) 또는 같은 컬럼의 DataFrame 을 ParsedStatement 로 변환합니다.
+    """
+    import pandas as pd
+    df = recs if isinstance(recs, pd.DataFrame) else pd.DataFrame(list(recs))
+    n = len(df)
+    amounts = np.zeros((n, len(AMOUNT_COLUMNS)), dtype=np.int64)
+    null = np.ones((n, len(AMOUNT_COLUMNS)), dtype=bool)
+    for i, name in enumerate(AMOUNT_COLUMNS):
+        if name in df and n:
+            amounts[:, i], null[:, i] = parse_amounts(df[name].tolist())
+
+    def text_col(name):
+        if name not in df:
+            return np.full(n, '', dtype=object)
+        return df[name].fillna('').astype(str).to_numpy(dtype=object)
+
+    return ParsedStatement(text_col('account_id'), text_col('account_nm'), amounts, null)
+
+
+def as_statement(data: Union[ParsedStatement, List[Dict], 'pd.DataFrame']) -> ParsedStatement:
+    return data if isinstance(data, ParsedStatement) else parse_statement(data)
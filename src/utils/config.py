@@ -0,0 +1,40 @@
+# src/utils/config.py
+#
+# 환경 설정은 import 시점이 아니라 처음 필요할 때 읽습니다.
+# (.env 로딩도 이때 한 번만 수행 → 대시보드/CLI 는 쓰지 않는 설정 때문에 실패하거나 느려지지 않음)
+import os
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def load_env() -> None:
+    """
+    .env 를 한 번만 읽어 환경변수에 반영합니다. (이미 설정된 값도 .env 값으로 덮어씀)
+    """
+    from dotenv import load_dotenv
+    load_dotenv(override=True)
+
+
+def setting(name: str, default: str = None) -> str:
+    """
+    환경변수 값을 반환합니다. 첫 호출 시 .env 를 로드합니다.
+    """
+    load_env()
+    return os.getenv(name, default)
+
+
+def setting_list(name: str, default: str = "") -> list:
+    """
+    콤마로 구분된 환경변수를 리스트로 반환합니다. (빈 항목 제외)
+    """
+    return [v.strip() for v in (setting(name, default) or "").split(",") if v.strip()]
+
+
+def require(name: str) -> str:
+    """
+    필수 환경변수 값을 반환하며, 없으면 RuntimeError 를 발생시킵니다.
+    """
+    value = setting(name)
+    if not value:
+        raise RuntimeError(f"환경변수 {name}이 설정되지 않았습니다.")
+    return value
@@ -1,20 +1,28 @@
-import os
-from dotenv import load_dotenv
-# 이걸 넣으면 .env가 제대로 덮어쓰기 돼서 이전 캐시가 무시될 가능성이 높아져.
-load_dotenv(override=True)
+# src/utils/db.py
+from functools import lru_cache
+from typing import Dict, Iterator, Optional
 
-import pandas as pd
-import numpy as np
-from sqlalchemy import create_engine, text
+from src.utils.config import require, setting
+
+# 연결 풀 기본값 (DB_POOL_SIZE / DB_MAX_OVERFLOW 환경변수) - API 서버처럼 동시 요청이 많으면 늘립니다.
+DEFAULT_POOL_SIZE = 5
+DEFAULT_MAX_OVERFLOW = 10
+# 스트리밍 조회 chunk 행 수 기본값 (DB_CHUNK_SIZE 환경변수)
+DEFAULT_CHUNK_SIZE = 10000
 
-# src/utils/db.py
-# DATABASE_URL 설정
-DATABASE_URL = os.getenv('DATABASE_URL')
-if not DATABASE_URL:
-    raise RuntimeError("환경변수 DATABASE_URL이 설정되지 않았습니다.")
 
-# SQLAlchemy 엔진 생성
-engine = create_engine(DATABASE_URL)
+@lru_cache(maxsize=None)
+def get_engine():
+    """
+    SQLAlchemy 엔진(연결 풀)을 처음 사용할 때 한 번만 생성합니다. (DATABASE_URL 필수)
+    """
+    from sqlalchemy import create_engine
+    return create_engine(
+        require("DATABASE_URL"),
+        pool_size=int(setting("DB_POOL_SIZE", DEFAULT_POOL_SIZE)),
+        max_overflow=int(setting("DB_MAX_OVERFLOW", DEFAULT_MAX_OVERFLOW)),
+        pool_pre_ping=True,  # Neon 등 유휴 연결이 끊기는 환경 대비
+    )
 
 
 def _convert_params(params: dict) -> dict:
@@ -23,6 +31,7 @@ def _convert_params(params: dict) -> dict:
     """
     if not params:
         return {}
+    import numpy as np
     converted = {}
     for key, value in params.items():
         if isinstance(value, np.generic):
@@ -32,12 +41,14 @@ def _convert_params(params: dict) -> dict:
     return converted
 
 
-def fetch_dataframe(query: str, params: dict = None) -> pd.DataFrame:
+def fetch_dataframe(query: str, params: dict = None):
     """
     SELECT 쿼리를 실행하고 pandas DataFrame으로 반환
     """
+    import pandas as pd
+    from sqlalchemy import text
     converted = _convert_params(params)
-    with engine.connect() as conn:
+    with get_engine().connect() as conn:
         result = conn.execute(text(query), converted)
         df = pd.DataFrame(result.fetchall(), columns=result.keys())
     return df
@@ -47,6 +58,31 @@ def execute_query(query: str, params: dict = None):
     """
     INSERT/UPDATE/DELETE 쿼리를 트랜잭션 내에서 실행하고 커밋
     """
+    from sqlalchemy import text
     converted = _convert_params(params)
-    with engine.begin() as conn:
+    with get_engine().begin() as conn:
         conn.execute(text(query), converted)
+
+
+def iter_dataframes(
+    query: str,
+    params: dict = None,
+    chunk_size: Optional[int] = None,
+    dtypes: Optional[Dict[str, str]] = None
+) -> Iterator:
+    """
+    SELECT 결과를 서버 측 커서(stream_results)로 chunk_size 행씩 읽어 DataFrame chunk 로 yield 합니다.
+    전체 결과를 한 번에 fetchall 하지 않으므로 메모리 사용량은 chunk 크기로 제한됩니다.
+    dtypes 를 주면 각 chunk 컬럼을 해당 타입으로 변환합니다.
+    """
+    import pandas as pd
+    from sqlalchemy import text
+    chunk_size = chunk_size or int(setting("DB_CHUNK_SIZE", DEFAULT_CHUNK_SIZE))
+    converted = _convert_params(params)
+    with get_engine().connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=chunk_size).execute(text(query), converted)
+        keys = list(result.keys())
+        for part in result.partitions(chunk_size):
+            df = pd.DataFrame.from_records(part, columns=keys, coerce_float=True)
+            yield df.astype(dtypes) if dtypes else df
+
@@ -0,0 +1,57 @@
+# src/utils/formatting.py
+from typing import TYPE_CHECKING
+
+# pandas 는 표 변환 시점에 import (payloads / API 서버 import 시간 단축)
+if TYPE_CHECKING:
+    import pandas as pd
+
+# 대시보드 원본 재무제표 표 컬럼 (순서대로 표시)
+RAW_COLUMNS = ["계정명", "당기금액(백만 원)", "당기금액(한글)", "전기금액(백만 원)", "전기금액(한글)"]
+
+
+def fmt(x):
+    import pandas as pd
+    return f"{x:,.2f}" if pd.notnull(x) else "N/A"
+
+
+def to_korean_amt(x):
+    """
+    백만 원 단위 금액을 '1조 2,345억 6천 7백 만 원' 형태로 변환합니다.
+    """
+    import pandas as pd
+    if pd.isna(x):
+        return ""
+    amount = int(x * 1_000_000)
+    jo = amount // 1_000_000_000_000
+    rem = amount % 1_000_000_000_000
+    eok = rem // 100_000_000
+    rem2 = rem % 100_000_000
+    man = rem2 // 10_000
+    thous = man // 1000
+    hund = (man % 1000) // 100
+    parts = []
+    if jo:
+        parts.append(f"{jo}조")
+    if eok:
+        parts.append(f"{eok:,}억")
+    if thous:
+        parts.append(f"{thous}천")
+    if hund:
+        parts.append(f"{hund}백")
+    if jo or eok or thous or hund:
+        parts.append("만 원")
+        return " ".join(parts)
+    return f"{amount:,}원"
+
+
+def format_raw_statement(raw_df: 'pd.DataFrame') -> 'pd.DataFrame':
+    """
+    (계정명, 당기금액(백만 원), 전기금액(백만 원)) DataFrame 을 대시보드 표시용 문자열 표로 변환합니다.
+    """
+    import pandas as pd
+    raw_fmt = raw_df.copy()
+    raw_fmt["당기금액(백만 원)"] = raw_fmt["당기금액(백만 원)"].map(lambda x: f"{x:,.0f}" if pd.notnull(x) else "")
+    raw_fmt["전기금액(백만 원)"] = raw_fmt["전기금액(백만 원)"].map(lambda x: f"{x:,.0f}" if pd.notnull(x) else "")
+    raw_fmt["당기금액(한글)"] = raw_df["당기금액(백만 원)"].apply(to_korean_amt)
+    raw_fmt["전기금액(한글)"] = raw_df["전기금액(백만 원)"].apply(to_korean_amt)
+    return raw_fmt[RAW_COLUMNS]
@@ -0,0 +1,402 @@
+# src/utils/migrations.py
+#
+# 버전별 DB 스키마 마이그레이션
+#   python -m src.utils.migrations          # 미적용 마이그레이션 적용
+#   python -m src.utils.migrations --check  # 적용 현황 / 누락 인덱스 점검 (변경 없음)
+import sys
+import logging
+import argparse
+from datetime import datetime
+from typing import Callable, List, Tuple, Union
+
+from sqlalchemy import text
+
+from src.utils.db import get_engine
+from src.utils.storage import ACCOUNT_DIM_DDL, migrate_legacy_raw
+
+logger = logging.getLogger(__name__)
+
+# raw_financials 연도 파티션 생성 범위 (범위 밖 연도는 default 파티션으로 들어감)
+PARTITION_FIRST_YEAR = 2000
+
+RAW_FINANCIALS_DDL = """
+CREATE TABLE IF NOT EXISTS raw_financials (
+    ticker        TEXT     NOT NULL,
+    year          INTEGER  NOT NULL,
+    report_code   TEXT     NOT NULL,
+    fs_div        TEXT     NOT NULL,
+    account_key   INTEGER  NOT NULL,
+    thstrm_amount BIGINT,
+    frmtrm_amount BIGINT,
+    bfefrm_amount BIGINT,
+    derived_from  INTEGER,
+    created_at    TIMESTAMPTZ NOT NULL DEFAULT NOW()
+) PARTITION BY RANGE (year)
+"""
+
+# ON CONFLICT 대상 + 대시보드 원본 조회(app.py) index-only scan 용
+RAW_FINANCIALS_KEY_INDEX = """
+CREATE UNIQUE INDEX IF NOT EXISTS raw_financials_key_uq
+    ON raw_financials(ticker, year, report_code, fs_div, account_key)
+    INCLUDE (thstrm_amount, frmtrm_amount)
+"""
+
+BASE_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS corp_codes (
+        corp_code     TEXT PRIMARY KEY,
+        stock_code    TEXT,
+        corp_name     TEXT,
+        is_listed     BOOLEAN,
+        listed_date   DATE,
+        delisted_date DATE,
+        induty_code   TEXT,
+        induty_checked_at TIMESTAMPTZ
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS dart_state (
+        date       DATE PRIMARY KEY,
+        used_calls INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS dart_cache (
+        corp_code    TEXT    NOT NULL,
+        stock_code   TEXT,
+        year         INTEGER NOT NULL,
+        report_code  TEXT    NOT NULL,
+        fs_div       TEXT,
+        recs         JSONB,
+        recs_z       BYTEA,
+        content_hash TEXT,
+        checked_at   TIMESTAMPTZ,
+        last_updated TIMESTAMPTZ NOT NULL DEFAULT NOW()
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS summary_financials (
+        corp_name              TEXT,
+        ticker                 TEXT    NOT NULL,
+        year                   INTEGER NOT NULL,
+        report_code            TEXT    NOT NULL,
+        fs_div                 TEXT    NOT NULL,
+        operating_margin       DOUBLE PRECISION,
+        roe                    DOUBLE PRECISION,
+        debt_ratio             DOUBLE PRECISION,
+        controlling_debt_ratio DOUBLE PRECISION,
+        derived_from           INTEGER,
+        created_at             TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+        updated_at             TIMESTAMPTZ NOT NULL DEFAULT NOW()
+    )
+    """,
+    ACCOUNT_DIM_DDL,
+    RAW_FINANCIALS_DDL,
+]
+
+# 조회 경로별 인덱스 (이름 → 생성 DDL). --check 는 이 목록 기준으로 누락을 보고합니다.
+INDEXES = {
+    # ON CONFLICT(corp_code, year, report_code) + 수집기 캐시 조회
+    "dart_cache_key_uq": """
+        CREATE UNIQUE INDEX IF NOT EXISTS dart_cache_key_uq
+            ON dart_cache(corp_code, year, report_code)
+    """,
+    "dart_cache_corp_year_idx": """
+        CREATE INDEX IF NOT EXISTS dart_cache_corp_year_idx
+            ON dart_cache(corp_code, year) INCLUDE (report_code, fs_div, stock_code)
+    """,
+    # app.py 요약 지표 조회: 키 4개 + 지표 컬럼 → index-only scan
+    "summary_financials_lookup_idx": """
+        CREATE INDEX IF NOT EXISTS summary_financials_lookup_idx
+            ON summary_financials(ticker, year, report_code, fs_div)
+            INCLUDE (operating_margin, roe, debt_ratio, controlling_debt_ratio)
+    """,
+    # 수집 계획(기수집 키 조회)
+    "summary_financials_year_report_idx": """
+        CREATE INDEX IF NOT EXISTS summary_financials_year_report_idx
+            ON summary_financials(year, report_code) INCLUDE (ticker, derived_from)
+    """,
+    "raw_financials_key_uq": RAW_FINANCIALS_KEY_INDEX,
+    "corp_codes_stock_code_idx": """
+        CREATE INDEX IF NOT EXISTS corp_codes_stock_code_idx
+            ON corp_codes(stock_code)
+    """,
+}
+
+
+def is_partitioned(conn, table: str) -> bool:
+    row = conn.execute(text("""
+        SELECT 1
+          FROM pg_partitioned_table p
+          JOIN pg_class c ON c.oid = p.partrelid
+         WHERE c.relname = :t
+    """), {"t": table}).fetchone()
+    return row is not None
+
+
+def ensure_year_partitions(conn, first_year: int = PARTITION_FIRST_YEAR, last_year: int = None):
+    """
+    raw_financials 의 연도별 파티션(raw_financials_y{연도})과 default 파티션을 만듭니다.
+    default 파티션에 이미 해당 연도 행이 있으면 새 파티션으로 옮긴 뒤 ATTACH 합니다.
+    (default 에 범위가 겹치는 행이 있으면 PARTITION OF 생성이 실패하므로)
+    """
+    last_year = last_year or datetime.now().year + 1
+    has_default = conn.execute(text("SELECT to_regclass('raw_financials_default')")).scalar() is not None
+    for yr in range(first_year, last_year + 1):
+        name = f"raw_financials_y{yr}"
+        if conn.execute(text("SELECT to_regclass(:t)"), {"t": name}).scalar() is not None:
+            continue
+        if not has_default:
+            conn.execute(text(f"""
+                CREATE TABLE {name}
+                    PARTITION OF raw_financials FOR VALUES FROM ({yr}) TO ({yr + 1})
+            """))
+            continue
+        conn.execute(text(f"CREATE TABLE {name} (LIKE raw_financials INCLUDING DEFAULTS)"))
+        moved = conn.execute(text(f"""
+            WITH moved AS (
+                DELETE FROM raw_financials_default WHERE year = :y RETURNING *
+            )
+            INSERT INTO {name} SELECT * FROM moved
+        """), {"y": yr}).rowcount
+        conn.execute(text(f"""
+            ALTER TABLE raw_financials
+                ATTACH PARTITION {name} FOR VALUES FROM ({yr}) TO ({yr + 1})
+        """))
+        logger.info(f"▷ raw_financials {yr}년 파티션 생성 (default 파티션에서 {moved}행 이동)")
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS raw_financials_default
+            PARTITION OF raw_financials DEFAULT
+    """))
+
+
+# ─── 마이그레이션 단계 ─────────────────────────────────────────────────────
+def _collector_columns(conn):
+    """
+    수집기가 사용하는 컬럼/제약을 기존 배포에 추가합니다. (보고서 코드별 캐시, 파생 연도 표시)
+    """
+    conn.execute(text("ALTER TABLE summary_financials ADD COLUMN IF NOT EXISTS derived_from INTEGER"))
+    conn.execute(text("ALTER TABLE raw_financials ADD COLUMN IF NOT EXISTS derived_from INTEGER"))
+    conn.execute(text("ALTER TABLE dart_cache ADD COLUMN IF NOT EXISTS recs_z BYTEA"))
+    conn.execute(text(INDEXES["dart_cache_key_uq"]))
+
+
+def _dart_cache_report_key(conn):
+    """
+    dart_cache 를 (corp_code, year, report_code) 로 유일하게 만듭니다.
+    보고서 코드 도입 전의 (corp_code, year, stock_code) unique 제약/인덱스가 남아 있으면
+    같은 연도의 분기·반기 캐시가 충돌하므로 삭제합니다.
+    """
+    legacy = conn.execute(text("""
+        SELECT i.relname AS index_name, con.conname AS constraint_name
+          FROM pg_index x
+          JOIN pg_class t ON t.oid = x.indrelid
+          JOIN pg_class i ON i.oid = x.indexrelid
+          LEFT JOIN pg_constraint con ON con.conindid = x.indexrelid AND con.conrelid = t.oid
+         WHERE t.relname = 'dart_cache'
+           AND x.indisunique
+           AND (SELECT array_agg(a.attname::text ORDER BY a.attname)
+                  FROM pg_attribute a
+                 WHERE a.attrelid = t.oid AND a.attnum = ANY(x.indkey)) = ARRAY['corp_code', 'stock_code', 'year']
+    """)).fetchall()
+    for r in legacy:
+        if r.constraint_name:
+            conn.execute(text(f'ALTER TABLE dart_cache DROP CONSTRAINT "{r.constraint_name}"'))
+        else:
+            conn.execute(text(f'DROP INDEX "{r.index_name}"'))
+        logger.info(f"▷ dart_cache 이전 unique 키 삭제: {r.constraint_name or r.index_name}")
+    conn.execute(text(INDEXES["dart_cache_key_uq"]))
+
+
+def _partition_raw(conn):
+    """
+    raw_financials 를 year 기준 range 파티션 테이블로 전환합니다. (이미 파티션이면 파티션만 보강)
+    """
+    if not is_partitioned(conn, "raw_financials"):
+        logger.info("▷ raw_financials 연도 파티션 전환 시작")
+        conn.execute(text("ALTER TABLE raw_financials RENAME TO raw_financials_legacy"))
+        conn.execute(text("ALTER INDEX IF EXISTS raw_financials_key_uq RENAME TO raw_financials_legacy_key_uq"))
+        conn.execute(text(RAW_FINANCIALS_DDL))
+        ensure_year_partitions(conn)
+        conn.execute(text(RAW_FINANCIALS_KEY_INDEX))
+        conn.execute(text("""
+            INSERT INTO raw_financials(
+              ticker, year, report_code, fs_div, account_key,
+              thstrm_amount, frmtrm_amount, bfefrm_amount,
+              derived_from, created_at
+            )
+            SELECT ticker, year, report_code, fs_div, account_key,
+                   thstrm_amount, frmtrm_amount, bfefrm_amount,
+                   derived_from, COALESCE(created_at, NOW())
+              FROM raw_financials_legacy
+            ON CONFLICT DO NOTHING
+        """))
+        conn.execute(text("DROP TABLE raw_financials_legacy"))
+        logger.info("▷ raw_financials 연도 파티션 전환 완료")
+    else:
+        ensure_year_partitions(conn)
+
+
+# 업종(KSIC 앞자리) × 연도 × 보고서 × 재무제표 구분 × 지표별 집계 (src.analysis.sector_stats)
+SECTOR_STATS_DDL = """
+CREATE TABLE IF NOT EXISTS sector_stats (
+    sector      TEXT    NOT NULL,
+    year        INTEGER NOT NULL,
+    report_code TEXT    NOT NULL,
+    fs_div      TEXT    NOT NULL,
+    metric      TEXT    NOT NULL,
+    n           INTEGER NOT NULL,
+    mean        DOUBLE PRECISION,
+    p25         DOUBLE PRECISION,
+    median      DOUBLE PRECISION,
+    p75         DOUBLE PRECISION,
+    updated_at  TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (sector, year, report_code, fs_div, metric)
+)
+"""
+
+DASHBOARD_PAYLOADS_DDL = """
+CREATE TABLE IF NOT EXISTS dashboard_payloads (
+    ticker       TEXT PRIMARY KEY,
+    payload      BYTEA NOT NULL,
+    content_hash TEXT  NOT NULL,
+    updated_at   TIMESTAMPTZ NOT NULL DEFAULT NOW()
+)
+"""
+
+
+def _indexes(conn):
+    for ddl in INDEXES.values():
+        conn.execute(text(ddl))
+
+
+Step = Union[List[str], Callable]
+
+# (버전, 이름, 단계) - 적용된 버전은 schema_migrations 에 기록되며 다시 실행하지 않습니다.
+MIGRATIONS: List[Tuple[int, str, Step]] = [
+    (1, "base_tables", BASE_TABLES),
+    (2, "compact_raw_financials", migrate_legacy_raw),
+    (3, "collector_columns", _collector_columns),
+    (4, "partition_raw_financials", _partition_raw),
+    (5, "lookup_indexes", _indexes),
+    (6, "dashboard_payloads", [DASHBOARD_PAYLOADS_DDL]),
+    # 재조회 내용 비교용 지문 / 마지막 확인 시각 (기존 행은 다음 재조회 때 한 번 채워짐)
+    (7, "cache_content_hash", [
+        "ALTER TABLE dart_cache ADD COLUMN IF NOT EXISTS content_hash TEXT",
+        "ALTER TABLE dart_cache ADD COLUMN IF NOT EXISTS checked_at TIMESTAMPTZ",
+    ]),
+    # 상장 상태 (src.data_collection.universe 가 KRX 상장 목록으로 갱신, NULL = 미동기화)
+    (8, "corp_listing_status", [
+        "ALTER TABLE corp_codes ADD COLUMN IF NOT EXISTS is_listed BOOLEAN",
+        "ALTER TABLE corp_codes ADD COLUMN IF NOT EXISTS listed_date DATE",
+        "ALTER TABLE corp_codes ADD COLUMN IF NOT EXISTS delisted_date DATE",
+    ]),
+    # 업종코드 캐시(company.json) + 업종 집계
+    (9, "sector_stats", [
+        "ALTER TABLE corp_codes ADD COLUMN IF NOT EXISTS induty_code TEXT",
+        "ALTER TABLE corp_codes ADD COLUMN IF NOT EXISTS induty_checked_at TIMESTAMPTZ",
+        SECTOR_STATS_DDL,
+    ]),
+    # 보고서 코드별 캐시 키 (upsert_cache 의 ON CONFLICT 대상) - 이전 (corp_code, year, stock_code) 키 제거
+    (10, "dart_cache_report_key", _dart_cache_report_key),
+    # 지표 변경 시각 (API ETag / Last-Modified watermark, 기존 행은 마이그레이션 시각)
+    (11, "summary_updated_at", [
+        "ALTER TABLE summary_financials ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()",
+    ]),
+]
+
+
+def _ensure_version_table(conn):
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version    INTEGER PRIMARY KEY,
+            name       TEXT NOT NULL,
+            applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+        )
+    """))
+
+
+def applied_versions(conn) -> set:
+    exists = conn.execute(text("SELECT to_regclass('schema_migrations')")).scalar()
+    if not exists:
+        return set()
+    return {r.version for r in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+
+def upgrade() -> List[int]:
+    """
+    미적용 마이그레이션을 버전 순으로 하나씩(각각 한 트랜잭션) 적용하고 적용한 버전 목록을 반환합니다.
+    raw_financials 연도 파티션(올해+1 까지)은 적용할 마이그레이션이 없어도 매번 보강합니다.
+    """
+    with get_engine().begin() as conn:
+        _ensure_version_table(conn)
+        done = applied_versions(conn)
+
+    applied = []
+    for version, name, step in MIGRATIONS:
+        if version in done:
+            continue
+        logger.info(f"▷ 마이그레이션 {version:04d}_{name} 적용")
+        with get_engine().begin() as conn:
+            if callable(step):
+                step(conn)
+            else:
+                for ddl in step:
+                    conn.execute(text(ddl))
+            conn.execute(text(
+                "INSERT INTO schema_migrations(version, name) VALUES (:v, :n)"
+            ), {"v": version, "n": name})
+        applied.append(version)
+
+    # 연도 파티션은 매 실행마다 보강 (내년 파티션이 default 로 들어가기 전에 미리 생성)
+    with get_engine().begin() as conn:
+        if is_partitioned(conn, "raw_financials"):
+            ensure_year_partitions(conn)
+    return applied
+
+
+def check() -> List[str]:
+    """
+    미적용 마이그레이션, 누락 인덱스, 파티션 미전환 상태를 점검해 문제 목록을 반환합니다. (DB 변경 없음)
+    """
+    problems = []
+    with get_engine().connect() as conn:
+        done = applied_versions(conn)
+        for version, name, _ in MIGRATIONS:
+            if version not in done:
+                problems.append(f"미적용 마이그레이션: {version:04d}_{name}")
+
+        existing = {r.indexname for r in conn.execute(text("""
+            SELECT indexname FROM pg_indexes WHERE indexname = ANY(:names)
+        """), {"names": list(INDEXES)})}
+        for name in INDEXES:
+            if name not in existing:
+                problems.append(f"누락 인덱스: {name}")
+
+        if conn.execute(text("SELECT to_regclass('raw_financials')")).scalar() \
+                and not is_partitioned(conn, "raw_financials"):
+            problems.append("raw_financials 가 연도 파티션 테이블이 아닙니다.")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="DB 스키마 마이그레이션")
+    parser.add_argument("--check", action="store_true", help="변경 없이 누락 마이그레이션/인덱스만 보고")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        problems = check()
+        for p in problems:
+            print(f"✗ {p}")
+        if not problems:
+            print("✓ 스키마 최신 상태 (누락 인덱스 없음)")
+        return 1 if problems else 0
+
+    applied = upgrade()
+    print(f"✓ 마이그레이션 {len(applied)}건 적용: {applied}" if applied else "✓ 적용할 마이그레이션 없음")
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format="%(asctime)s [%(levelname)s] %(message)s", level=logging.INFO)
+    sys.exit(main())
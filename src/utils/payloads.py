@@ -0,0 +1,153 @@
+# src/utils/payloads.py
+#
+# 종목별 대시보드 payload 사전 계산
+#   - 수집기가 데이터가 바뀐 종목만 다시 만들어 dashboard_payloads(또는 PAYLOAD_DIR 파일)에 저장
+#   - 대시보드는 종목 키 한 번 조회로 모든 연도·보고서의 요약 지표와 포맷된 원본 재무제표를 얻음
+import os
+import json
+import zlib
+import hashlib
+import logging
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import text
+
+from src.utils.config import setting
+from src.utils.db import get_engine, fetch_dataframe
+from src.utils.formatting import format_raw_statement
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_FIELDS = ["operating_margin", "roe", "debt_ratio", "controlling_debt_ratio", "derived_from"]
+
+
+def payload_dir() -> str:
+    """
+    PAYLOAD_DIR 설정 시 DB 대신 로컬 파일({PAYLOAD_DIR}/{ticker}.json.z)에 저장/조회
+    """
+    return setting('PAYLOAD_DIR', '') or ''
+
+
+def payload_key(year, reprt_code, fs_div) -> str:
+    return f"{int(year)}|{reprt_code}|{fs_div}"
+
+
+def build_payload(ticker: str) -> Optional[Dict]:
+    """
+    ticker 의 전체 summary_financials 행과 포맷된 raw_financials 표를 하나의 dict 로 만듭니다.
+    요약 데이터가 없으면 None.
+    """
+    summary = fetch_dataframe("""
+        SELECT corp_name, year, report_code, fs_div,
+               operating_margin, roe, debt_ratio, controlling_debt_ratio, derived_from
+          FROM summary_financials
+         WHERE ticker = :t
+    """, {"t": ticker})
+    if summary.empty:
+        return None
+
+    raw = fetch_dataframe("""
+        SELECT r.year, r.report_code, r.fs_div,
+               a.account_nm   AS "계정명",
+               (r.thstrm_amount / 1000000.0) AS "당기금액(백만 원)",
+               (r.frmtrm_amount / 1000000.0) AS "전기금액(백만 원)"
+          FROM raw_financials r
+          JOIN account_dim a ON a.account_key = r.account_key
+         WHERE r.ticker = :t
+    """, {"t": ticker})
+
+    summary = summary.astype(object).where(summary.notna(), None)
+    payload = {
+        "ticker": ticker,
+        "corp_name": summary["corp_name"].dropna().iloc[0] if summary["corp_name"].notna().any() else "",
+        "summary": {
+            payload_key(r["year"], r["report_code"], r["fs_div"]): {f: r[f] for f in SUMMARY_FIELDS}
+            for _, r in summary.iterrows()
+        },
+        "raw": {},
+    }
+    for (yr, rpt, fdiv), grp in raw.groupby(["year", "report_code", "fs_div"], sort=True):
+        payload["raw"][payload_key(yr, rpt, fdiv)] = format_raw_statement(
+            grp[["계정명", "당기금액(백만 원)", "전기금액(백만 원)"]].astype(
+                {"당기금액(백만 원)": float, "전기금액(백만 원)": float}
+            )
+        ).values.tolist()
+    return payload
+
+
+def _encode(payload: Dict) -> Tuple[bytes, str]:
+    body = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(',', ':'), default=float)
+    return zlib.compress(body.encode('utf-8'), 6), hashlib.sha1(body.encode('utf-8')).hexdigest()
+
+
+def _decode(blob: bytes) -> Dict:
+    return json.loads(zlib.decompress(bytes(blob)).decode('utf-8'))
+
+
+def save_payload(ticker: str, payload: Dict) -> bool:
+    """
+    payload 를 저장합니다. 내용 해시가 같으면 쓰지 않고 False 를 반환합니다.
+    """
+    blob, digest = _encode(payload)
+    directory = payload_dir()
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{ticker}.json.z")
+        hash_path = path + ".sha1"
+        if os.path.exists(hash_path):
+            with open(hash_path) as f:
+                if f.read().strip() == digest:
+                    return False
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(blob)
+        os.replace(tmp, path)
+        with open(hash_path, "w") as f:
+            f.write(digest)
+        return True
+
+    with get_engine().begin() as conn:
+        row = conn.execute(text("""
+            INSERT INTO dashboard_payloads(ticker, payload, content_hash, updated_at)
+            VALUES (:t, :p, :h, NOW())
+            ON CONFLICT(ticker) DO UPDATE SET
+              payload      = EXCLUDED.payload,
+              content_hash = EXCLUDED.content_hash,
+              updated_at   = NOW()
+            WHERE dashboard_payloads.content_hash IS DISTINCT FROM EXCLUDED.content_hash
+            RETURNING ticker
+        """), {"t": ticker, "p": blob, "h": digest}).fetchone()
+    return row is not None
+
+
+def load_payload(ticker: str) -> Optional[Dict]:
+    """
+    대시보드용 payload 를 키 하나로 조회합니다. 없으면 None.
+    """
+    directory = payload_dir()
+    if directory:
+        path = os.path.join(directory, f"{ticker}.json.z")
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            return _decode(f.read())
+
+    df = fetch_dataframe("SELECT payload FROM dashboard_payloads WHERE ticker = :t", {"t": ticker})
+    if df.empty:
+        return None
+    return _decode(df["payload"].iloc[0])
+
+
+def refresh_payloads(tickers: Iterable[str]) -> int:
+    """
+    데이터가 바뀐 종목들의 payload 를 다시 만들어 저장하고, 실제로 갱신된 종목 수를 반환합니다.
+    """
+    updated = 0
+    for tkr in sorted(set(tickers)):
+        payload = build_payload(tkr)
+        if payload is None:
+            continue
+        if save_payload(tkr, payload):
+            updated += 1
+    logger.info(f"▷ 대시보드 payload 갱신 {updated}건")
+    return updated
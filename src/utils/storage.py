@@ -0,0 +1,385 @@
+# src/utils/storage.py
+import json
+import zlib
+import hashlib
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import event, text
+
+from src.utils.amounts import ParsedStatement, as_statement
+from src.utils.config import setting
+
+logger = logging.getLogger(__name__)
+
+# dart_cache 원본 JSON 보관 방식
+#   json : recs(JSONB)에 그대로 저장 (기존 방식)
+#   zlib : recs_z(bytea)에 zlib 압축 저장, recs 는 NULL
+#   none : 원본을 저장하지 않음 (보고서 코드/재무제표 구분 등 메타만 저장)
+DEFAULT_CACHE_PAYLOAD = 'zlib'
+
+# 계정 사전 (account_id, account_nm) → account_key, 프로세스 내 캐시 (커밋된 키만)
+_ACCOUNT_KEYS: Dict[Tuple[str, str], int] = {}
+
+# ─── 기존(text) raw_financials → compact 스키마 변환 DDL ─────────────────────
+ACCOUNT_DIM_DDL = """
+CREATE TABLE IF NOT EXISTS account_dim (
+    account_key SERIAL PRIMARY KEY,
+    account_id  TEXT NOT NULL,
+    account_nm  TEXT NOT NULL,
+    UNIQUE (account_id, account_nm)
+)
+"""
+
+
+def _sql_amount(col: str) -> str:
+    """
+    text 금액 컬럼을 bigint 로 바꾸는 SQL 식 (콤마/공백 제거, '-'·빈값 → NULL, (123) → -123)
+    """
+    digits = f"NULLIF(regexp_replace({col}, '[^0-9]', '', 'g'), '')::bigint"
+    return (
+        f"CASE WHEN btrim({col}) ~ '^\\(.*\\)$' OR btrim({col}) ~ '^-[0-9]' "
+        f"THEN -{digits} ELSE {digits} END"
+    )
+
+
+def migrate_legacy_raw(conn):
+    """
+    text 로 저장된 raw_financials 를 compact 스키마로 변환합니다. (이미 변환됐으면 아무 것도 하지 않음)
+      - account_id/account_nm → account_dim.account_key (int)
+      - *_amount text → bigint
+      - 행마다 반복되던 corp_name 제거 (corp_codes 에서 조회)
+    """
+    conn.execute(text(ACCOUNT_DIM_DDL))
+    legacy = conn.execute(text("""
+        SELECT 1 FROM information_schema.columns
+         WHERE table_name = 'raw_financials' AND column_name = 'account_nm'
+    """)).fetchone()
+    if not legacy:
+        return False
+
+    logger.info("▷ raw_financials compact 변환 시작")
+    conn.execute(text("""
+        INSERT INTO account_dim(account_id, account_nm)
+        SELECT DISTINCT COALESCE(account_id, ''), COALESCE(account_nm, '')
+          FROM raw_financials
+        ON CONFLICT (account_id, account_nm) DO NOTHING
+    """))
+    conn.execute(text("ALTER TABLE raw_financials ADD COLUMN IF NOT EXISTS account_key integer"))
+    conn.execute(text("""
+        UPDATE raw_financials r
+           SET account_key = a.account_key
+          FROM account_dim a
+         WHERE a.account_id = COALESCE(r.account_id, '')
+           AND a.account_nm = COALESCE(r.account_nm, '')
+    """))
+    for col in ("thstrm_amount", "frmtrm_amount", "bfefrm_amount"):
+        conn.execute(text(
+            f"ALTER TABLE raw_financials ALTER COLUMN {col} TYPE bigint USING {_sql_amount(col)}"
+        ))
+    # account_id 를 포함한 기존 unique 제약/인덱스는 컬럼 삭제 시 함께 삭제됨
+    conn.execute(text("""
+        ALTER TABLE raw_financials
+          DROP COLUMN account_id,
+          DROP COLUMN account_nm,
+          DROP COLUMN IF EXISTS corp_name,
+          ALTER COLUMN account_key SET NOT NULL
+    """))
+    conn.execute(text("""
+        CREATE UNIQUE INDEX IF NOT EXISTS raw_financials_key_uq
+            ON raw_financials(ticker, year, report_code, fs_div, account_key)
+    """))
+    conn.execute(text("ALTER TABLE dart_cache ADD COLUMN IF NOT EXISTS recs_z bytea"))
+    conn.execute(text("ALTER TABLE dart_cache ALTER COLUMN recs DROP NOT NULL"))
+    logger.info("▷ raw_financials compact 변환 완료")
+    return True
+
+
+# ─── 계정 사전 ─────────────────────────────────────────────────────────────
+def intern_accounts(conn, pairs: List[Tuple[str, str]]) -> Dict[Tuple[str, str], int]:
+    """
+    (account_id, account_nm) 목록을 account_dim 에 등록하고 account_key 매핑을 반환합니다.
+    이미 본 계정은 프로세스 캐시에서 바로 돌려주므로 DB 왕복은 새 계정이 있을 때만 발생합니다.
+    새로 조회한 키는 conn 의 트랜잭션이 커밋된 뒤에만 캐시에 넣습니다.
+    (롤백되면 account_dim 에 없는 키가 캐시에 남아 이후 raw 행이 조인에서 빠지므로)
+    """
+    keys = {p: _ACCOUNT_KEYS[p] for p in pairs if p in _ACCOUNT_KEYS}
+    missing = sorted({p for p in pairs if p not in keys})
+    if missing:
+        params = {
+            "ids": [p[0] for p in missing],
+            "nms": [p[1] for p in missing],
+        }
+        conn.execute(text("""
+            INSERT INTO account_dim(account_id, account_nm)
+            SELECT * FROM unnest(CAST(:ids AS text[]), CAST(:nms AS text[]))
+            ON CONFLICT (account_id, account_nm) DO NOTHING
+        """), params)
+        rows = conn.execute(text("""
+            SELECT a.account_key, a.account_id, a.account_nm
+              FROM account_dim a
+              JOIN unnest(CAST(:ids AS text[]), CAST(:nms AS text[])) AS k(account_id, account_nm)
+                ON a.account_id = k.account_id AND a.account_nm = k.account_nm
+        """), params)
+        fetched = {(r.account_id, r.account_nm): r.account_key for r in rows}
+        keys.update(fetched)
+        event.listen(conn, "commit", lambda *_: _ACCOUNT_KEYS.update(fetched), once=True)
+    return {p: keys[p] for p in pairs}
+
+
+def insert_raw(conn, ticker, year, report_code, fs_div, recs, derived_from=None, replace=False) -> int:
+    """
+    raw_financials(compact)에 재무제표(ParsedStatement 또는 recs)를 한 번의 executemany 로 upsert 합니다.
+    금액은 파싱된 int64 컬럼을 그대로 bigint 로 쓰고, 결측은 NULL 로 저장합니다.
+    파생 행은 직접 수집한 행을 덮어쓰지 않고, 직접 수집분 또는 더 최신 보고서 파생분으로만 교체됩니다.
+    replace=True 인 직접 수집분(원본 해시가 바뀐 재수집)은 같은 키의 직접 수집 행을 먼저 지우고 다시 넣어
+    정정 공시로 바뀐 금액과 빠지거나 이름이 바뀐 계정까지 반영합니다. (conn 의 트랜잭션 안에서 실행)
+    """
+    stmt = as_statement(recs)
+    if replace and derived_from is None:
+        conn.execute(text("""
+            DELETE FROM raw_financials
+             WHERE ticker = :tk AND year = :yr AND report_code = :rp AND fs_div = :fd
+               AND derived_from IS NULL
+        """), {"tk": ticker, "yr": year, "rp": report_code, "fd": fs_div})
+    if not len(stmt):
+        return 0
+    pairs = list(zip(stmt.account_id.tolist(), stmt.account_nm.tolist()))
+    keys = intern_accounts(conn, pairs)
+    amounts = stmt.amounts.tolist()
+    null = stmt.null.tolist()
+    rows = [{
+        "tk": ticker, "yr": year, "rp": report_code, "fd": fs_div,
+        "ak": keys[p],
+        "ta": None if n[0] else a[0],
+        "fa": None if n[1] else a[1],
+        "ba": None if n[2] else a[2],
+        "df": derived_from,
+    } for p, a, n in zip(pairs, amounts, null)]
+    conn.execute(text("""
+        INSERT INTO raw_financials(
+          ticker, year, report_code, fs_div, account_key,
+          thstrm_amount, frmtrm_amount, bfefrm_amount,
+          derived_from, created_at
+        ) VALUES (
+          :tk, :yr, :rp, :fd, :ak,
+          :ta, :fa, :ba,
+          :df, NOW()
+        )
+        ON CONFLICT(ticker, year, report_code, fs_div, account_key)
+        DO UPDATE SET
+          thstrm_amount = EXCLUDED.thstrm_amount,
+          frmtrm_amount = EXCLUDED.frmtrm_amount,
+          bfefrm_amount = EXCLUDED.bfefrm_amount,
+          derived_from  = EXCLUDED.derived_from
+        WHERE raw_financials.derived_from IS NOT NULL
+          AND (EXCLUDED.derived_from IS NULL
+               OR EXCLUDED.derived_from >= raw_financials.derived_from)
+    """), rows)
+    return len(rows)
+
+
+def upsert_summary(conn, corp_name, ticker, year, report_code, fs_div, summary: Dict, derived_from=None) -> bool:
+    """
+    summary_financials 에 재무 지표(summarize_financials 결과)를 upsert 합니다.
+    파생 지표(derived_from)는 직접 수집한 지표나 더 최신 보고서의 파생 지표를 덮어쓰지 않습니다.
+    실제로 쓰였으면 True.
+    """
+    values = {
+        "om": summary["operating_margin"], "roe": summary["roe"],
+        "dr": summary["debt_ratio"], "cr": summary["controlling_debt_ratio"],
+        "df": derived_from,
+        "tk": ticker, "yr": year, "rp": report_code, "fd": fs_div,
+    }
+    # 먼저 업데이트 시도
+    result = conn.execute(text("""
+        UPDATE summary_financials
+        SET operating_margin = :om,
+            roe = :roe,
+            debt_ratio = :dr,
+            controlling_debt_ratio = :cr,
+            derived_from = :df,
+            updated_at = NOW()
+        WHERE ticker = :tk AND year = :yr AND report_code = :rp AND fs_div = :fd
+          AND (CAST(:df AS integer) IS NULL
+               OR (derived_from IS NOT NULL AND derived_from <= :df))
+    """), values)
+    if result.rowcount:
+        return True
+    # 행이 없으면 새로 삽입 (직접 수집한 행이 이미 있으면 삽입하지 않음)
+    result = conn.execute(text("""
+        INSERT INTO summary_financials(
+        corp_name, ticker, year, report_code, fs_div,
+        operating_margin, roe, debt_ratio, controlling_debt_ratio,
+        derived_from, created_at
+        )
+        SELECT :cn, :tk, :yr, :rp, :fd,
+               :om, :roe, :dr, :cr,
+               :df, NOW()
+        WHERE NOT EXISTS (
+            SELECT 1 FROM summary_financials
+             WHERE ticker = :tk AND year = :yr AND report_code = :rp AND fs_div = :fd
+        )
+    """), {**values, "cn": corp_name})
+    return result.rowcount > 0
+
+
+def bulk_upsert_summaries(conn, rows: List[Dict]) -> int:
+    """
+    summary_financials 에 여러 행을 배열 파라미터 2개 문장(UPDATE + INSERT)으로 upsert 합니다.
+    rows: {corp_name, ticker, year, report_code, fs_div, operating_margin, roe, debt_ratio,
+           controlling_debt_ratio, derived_from}
+    같은 키가 여러 번 있으면 직접 수집분 → 최신 보고서 파생분 순으로 하나만 남기며,
+    upsert_summary 와 같은 규칙으로 파생 지표는 직접 수집한 지표를 덮어쓰지 않습니다.
+    """
+    best: Dict[Tuple, Dict] = {}
+    for r in rows:
+        key = (r["ticker"], r["year"], r["report_code"], r["fs_div"])
+        cur = best.get(key)
+        rank = float("inf") if r["derived_from"] is None else r["derived_from"]
+        if cur is None or rank > (float("inf") if cur["derived_from"] is None else cur["derived_from"]):
+            best[key] = r
+    if not best:
+        return 0
+    cols = ["corp_name", "ticker", "year", "report_code", "fs_div",
+            "operating_margin", "roe", "debt_ratio", "controlling_debt_ratio", "derived_from"]
+    params = {c: [r[c] for r in best.values()] for c in cols}
+    values = """
+        unnest(
+          CAST(:corp_name AS text[]), CAST(:ticker AS text[]), CAST(:year AS integer[]),
+          CAST(:report_code AS text[]), CAST(:fs_div AS text[]),
+          CAST(:operating_margin AS float8[]), CAST(:roe AS float8[]),
+          CAST(:debt_ratio AS float8[]), CAST(:controlling_debt_ratio AS float8[]),
+          CAST(:derived_from AS integer[])
+        ) AS v(corp_name, ticker, year, report_code, fs_div,
+               operating_margin, roe, debt_ratio, controlling_debt_ratio, derived_from)
+    """
+    updated = conn.execute(text(f"""
+        UPDATE summary_financials s
+           SET operating_margin       = v.operating_margin,
+               roe                    = v.roe,
+               debt_ratio             = v.debt_ratio,
+               controlling_debt_ratio = v.controlling_debt_ratio,
+               derived_from           = v.derived_from,
+               updated_at             = NOW()
+          FROM {values}
+         WHERE s.ticker = v.ticker AND s.year = v.year
+           AND s.report_code = v.report_code AND s.fs_div = v.fs_div
+           AND (v.derived_from IS NULL
+                OR (s.derived_from IS NOT NULL AND s.derived_from <= v.derived_from))
+    """), params).rowcount
+    inserted = conn.execute(text(f"""
+        INSERT INTO summary_financials(
+          corp_name, ticker, year, report_code, fs_div,
+          operating_margin, roe, debt_ratio, controlling_debt_ratio,
+          derived_from, created_at
+        )
+        SELECT v.corp_name, v.ticker, v.year, v.report_code, v.fs_div,
+               v.operating_margin, v.roe, v.debt_ratio, v.controlling_debt_ratio,
+               v.derived_from, NOW()
+          FROM {values}
+         WHERE NOT EXISTS (
+            SELECT 1 FROM summary_financials s
+             WHERE s.ticker = v.ticker AND s.year = v.year
+               AND s.report_code = v.report_code AND s.fs_div = v.fs_div
+         )
+    """), params).rowcount
+    return updated + inserted
+
+
+# ─── dart_cache 원본 ───────────────────────────────────────────────────────
+def encode_cache_payload(recs) -> Dict[str, Optional[object]]:
+    """
+    DART_CACHE_PAYLOAD 설정에 따라 dart_cache 의 recs / recs_z 컬럼 값을 만듭니다.
+    ParsedStatement 는 파싱된 금액(int/None) 레코드로 저장하므로 다시 읽을 때 문자열 파싱이 없습니다.
+    """
+    mode = (setting('DART_CACHE_PAYLOAD', DEFAULT_CACHE_PAYLOAD) or DEFAULT_CACHE_PAYLOAD).strip().lower()
+    if mode == 'none':
+        return {"j": None, "z": None}
+    if isinstance(recs, ParsedStatement):
+        recs = recs.to_records()
+    payload = json.dumps(recs, ensure_ascii=False, separators=(',', ':'))
+    if mode == 'json':
+        return {"j": payload, "z": None}
+    return {"j": None, "z": zlib.compress(payload.encode('utf-8'), 6)}
+
+
+def decode_cache_payload(recs, recs_z=None) -> Optional[List[Dict]]:
+    """
+    dart_cache 행의 recs(JSONB) 또는 recs_z(zlib) 를 recs 리스트로 복원합니다. (없으면 None)
+    """
+    if recs_z is not None:
+        return json.loads(zlib.decompress(bytes(recs_z)).decode('utf-8'))
+    if recs is None:
+        return None
+    return recs if isinstance(recs, (list, dict)) else json.loads(recs)
+
+
+def content_hash(recs, fs_div: str) -> str:
+    """
+    재무제표 내용 지문 (fs_div + 계정 + 파싱된 금액/결측). 저장 형식(json/zlib)과 무관하게 같은 내용이면 같은 값.
+    """
+    stmt = as_statement(recs)
+    h = hashlib.sha1()
+    h.update((fs_div or '').encode('utf-8'))
+    h.update('\x1f'.join(stmt.account_id.tolist()).encode('utf-8'))
+    h.update(b'\x1e')
+    h.update('\x1f'.join(stmt.account_nm.tolist()).encode('utf-8'))
+    h.update(np.ascontiguousarray(stmt.amounts, dtype=np.int64).tobytes())
+    h.update(np.ascontiguousarray(stmt.null, dtype=np.bool_).tobytes())
+    return h.hexdigest()
+
+
+def touch_cache(conn, corp_code, year, report_code):
+    """
+    내용이 바뀌지 않은 재조회: checked_at 만 갱신합니다. (원본/last_updated 는 그대로)
+    """
+    conn.execute(text("""
+        UPDATE dart_cache
+           SET checked_at = NOW()
+         WHERE corp_code = :c AND year = :y AND report_code = :r
+    """), {"c": corp_code, "y": year, "r": report_code})
+
+
+def upsert_cache(conn, corp_code, stock_code, year, recs, report_code, fs_div, digest: str = None) -> bool:
+    """
+    dart_cache 에 (corp_code, year, report_code) 단위로 원본을 upsert 합니다.
+    저장된 content_hash 와 같으면 원본을 다시 쓰지 않고 checked_at 만 갱신하며 False 를 반환합니다.
+    last_updated 는 내용이 실제로 바뀐 시각입니다.
+    """
+    digest = digest or content_hash(recs, fs_div)
+    payload = encode_cache_payload(recs)
+    row = conn.execute(text("""
+        INSERT INTO dart_cache(
+          corp_code, stock_code, year,
+          report_code, fs_div, recs, recs_z,
+          content_hash, checked_at
+        ) VALUES (
+          :c, :s, :y,
+          :r, :f, CAST(:j AS jsonb), :z,
+          :h, NOW()
+        )
+        ON CONFLICT(corp_code, year, report_code)
+        DO UPDATE SET
+          fs_div        = EXCLUDED.fs_div,
+          recs          = EXCLUDED.recs,
+          recs_z        = EXCLUDED.recs_z,
+          content_hash  = EXCLUDED.content_hash,
+          checked_at    = NOW(),
+          last_updated  = NOW()
+        WHERE dart_cache.content_hash IS DISTINCT FROM EXCLUDED.content_hash
+        RETURNING corp_code
+    """), {
+        "c": corp_code,
+        "s": stock_code,
+        "y": year,
+        "r": report_code,
+        "f": fs_div,
+        "h": digest,
+        **payload
+    }).fetchone()
+    if row is None:
+        touch_cache(conn, corp_code, year, report_code)
+        return False
+    return True
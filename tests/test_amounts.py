@@ -0,0 +1,25 @@
+from src.utils.amounts import parse_amounts, parse_statement
+
+
+def test_parse_amounts_exact_integers():
+    values, null = parse_amounts([
+        "9,007,199,254,740,993", "(1,234)", "-1,234", " 1234 ", 1234, "1234.0",
+    ])
+
+    assert values.tolist() == [9007199254740993, -1234, -1234, 1234, 1234, 1234]
+    assert not null.any()
+
+
+def test_parse_amounts_missing_values():
+    values, null = parse_amounts(["", "-", None, "N/A", "1.5", "99999999999999999999"])
+
+    assert null.all()
+    assert values.tolist() == [0] * 6
+
+
+def test_parse_statement_keeps_null_mask():
+    stmt = parse_statement([{"account_id": "a", "account_nm": "n",
+                             "thstrm_amount": "(1,000)", "frmtrm_amount": "-", "bfefrm_amount": ""}])
+
+    assert stmt.to_records()[0] == {"account_id": "a", "account_nm": "n", "thstrm_amount": -1000,
+                                    "frmtrm_amount": None, "bfefrm_amount": None}
@@ -0,0 +1,47 @@
+from src.data_collection.dart_api import FS_PRIORITY
+from src.data_collection.planner import allocate, build_tasks, describe
+
+MAPPING = {"000001": "c1", "000002": "c2", "000003": "c3"}
+
+
+def _tasks(monkeypatch, done):
+    monkeypatch.setenv("WATCHLIST", "")
+    monkeypatch.setenv("MARKET_CAP_FILE", "")
+    return build_tasks(MAPPING, [2024], 2025, reprt_codes=["11011"], done=done)
+
+
+def test_full_mode_costs_ofs_cache_like_uncached(monkeypatch):
+    # 000001: CFS 캐시(기수집) / 000002: OFS 캐시만 있음 / 000003: 캐시 없음
+    done = {("000001", 2024, "11011")}
+    plan = allocate(_tasks(monkeypatch, done), "full", budget=100, derive=False)
+
+    assert [i.ticker for i in plan.items] == ["000002", "000003"]
+    assert [i.cost for i in plan.items] == [len(FS_PRIORITY)] * 2
+    assert plan.calls == 2 * len(FS_PRIORITY)
+
+
+def test_full_mode_defers_past_budget(monkeypatch):
+    plan = allocate(_tasks(monkeypatch, set()), "full", budget=len(FS_PRIORITY) * 2 + 1, derive=False)
+
+    assert len(plan.items) == 2
+    assert len(plan.deferred) == 1
+    assert plan.calls <= plan.budget
+
+
+def test_describe_matches_allocated_calls(monkeypatch):
+    done = {("000001", 2024, "11011")}
+    for mode in ("full", "headline"):
+        plan = allocate(_tasks(monkeypatch, done), mode, budget=100, derive=False)
+        text = describe(plan)
+
+        assert f"예상 호출 수: {plan.calls:,}" in text
+        assert f"11011 2024: {len(plan.items):,}건 (호출 최대 {plan.calls:,}회)" in text
+
+
+def test_only_stored_derived_rows_are_skipped(monkeypatch):
+    # 000001 의 2024 는 파생 행이 실제로 있음 / 나머지는 원본이 계획만 됐어도 직접 계획
+    tasks = _tasks(monkeypatch, set())
+    plan = allocate(tasks, "full", budget=100, derived={("000001", 2024, "11011")})
+
+    assert [i.ticker for i in plan.derived] == ["000001"]
+    assert [i.ticker for i in plan.items] == ["000002", "000003"]
@@ -0,0 +1,37 @@
+from src.analysis.ratios import summarize_financials
+from src.data_collection.derive import derive_prior_years
+from src.utils.amounts import parse_statement
+
+REPORT = [
+    {"account_id": "ifrs-full_Revenue", "account_nm": "매출액",
+     "thstrm_amount": "1,000", "frmtrm_amount": "900", "bfefrm_amount": "800"},
+    {"account_id": "ifrs-full_OperatingProfitLoss", "account_nm": "영업이익",
+     "thstrm_amount": "100", "frmtrm_amount": "90", "bfefrm_amount": ""},
+    {"account_id": "ifrs-full_ProfitLoss", "account_nm": "당기순이익",
+     "thstrm_amount": "50", "frmtrm_amount": "40", "bfefrm_amount": "30"},
+    {"account_id": "ifrs-full_Liabilities", "account_nm": "부채총계",
+     "thstrm_amount": "400", "frmtrm_amount": "300", "bfefrm_amount": ""},
+    {"account_id": "ifrs-full_Equity", "account_nm": "자본총계",
+     "thstrm_amount": "600", "frmtrm_amount": "500", "bfefrm_amount": "450"},
+]
+
+
+def test_direct_report_metrics():
+    s = summarize_financials(parse_statement(REPORT), "000001")
+
+    assert s["operating_margin"] == 10.0
+    assert s["debt_ratio"] == 40.0
+
+
+def test_missing_prior_year_accounts_are_none_not_zero():
+    derived = derive_prior_years(parse_statement(REPORT), 2024, "11011")
+
+    prior = summarize_financials(derived[2023], "000001")
+    assert prior["operating_margin"] == 10.0
+
+    # 2022(bfefrm): 영업이익·부채 금액 결측 → 0.0 이 아니라 None
+    older = summarize_financials(derived[2022], "000001")
+    assert older["operating_margin"] is None
+    assert older["debt_ratio"] is None
+    assert older["controlling_debt_ratio"] is None
+    assert older["roe"] is not None